@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.orm import Session
+from models import Booking, CaregiverDaySlots
+
+# 🔹 Booking Archive
+# Expired bookings older than ARCHIVE_AFTER move out of the live `bookings` table into one
+# table per month of their end time (bookings_archive_YYYY_MM), so the live table, the
+# expiry sweep and the overlap checks only ever see the recent booking window.
+ARCHIVE_AFTER = timedelta(days=int(os.getenv("PETCARE_ARCHIVE_AFTER_DAYS", "30")))
+ARCHIVE_INTERVAL = float(os.getenv("PETCARE_ARCHIVE_INTERVAL", "3600"))  # Seconds between archival runs
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_PREFIX = "bookings_archive_"
+
+# Kept apart from Base.metadata so create_all() never creates partitions
+archive_metadata = MetaData()
+_tables_lock = threading.Lock()
+
+def partition_name(ends_at: datetime) -> str:
+    return f"{ARCHIVE_PREFIX}{ends_at:%Y_%m}"
+
+def archive_table(name: str) -> Table:
+    """Returns the Table for one monthly partition: the booking columns without constraints."""
+    with _tables_lock:
+        table = archive_metadata.tables.get(name)
+        if table is None:
+            columns = [Column(c.name, c.type, primary_key=c.primary_key) for c in Booking.__table__.columns]
+            table = Table(
+                name, archive_metadata, *columns,
+                Index(f"ix_{name}_caregiver_id", "caregiver_id"),
+                Index(f"ix_{name}_pet_id", "pet_id"),
+            )
+        return table
+
+def list_partitions(db: Session, date_from=None, date_to=None):
+    """Existing partition names, oldest first, limited to months that can hold bookings in the range."""
+    names = sorted(db.scalars(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"
+    ), {"prefix": ARCHIVE_PREFIX + "%"}))
+    # ✅ Partitions are by end time and bookings last at most a day, so prune by month name
+    if date_from is not None:
+        names = [n for n in names if n >= f"{ARCHIVE_PREFIX}{date_from:%Y_%m}"]
+    if date_to is not None:
+        names = [n for n in names if n <= f"{ARCHIVE_PREFIX}{date_to + timedelta(days=1):%Y_%m}"]
+    return names
+
+
+# 🔹 Archival Job
+def archive_expired_bookings(db: Session, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Moves inactive bookings that ended before now - ARCHIVE_AFTER into their monthly partitions."""
+    started = time.perf_counter()
+    cutoff = datetime.now() - ARCHIVE_AFTER
+    columns = [c.name for c in Booking.__table__.columns]
+    archived, partitions = 0, set()
+    # ✅ The newest row always stays live: SQLite hands out max(id) + 1, so archiving it
+    # would let the next booking reuse an id that already exists in a partition
+    newest_id = db.scalar(select(func.max(Booking.id))) or 0
+
+    while True:
+        # Walks the ends_at index; each batch is copied and deleted in one transaction
+        batch = db.execute(
+            select(Booking.id, Booking.ends_at)
+            .where(Booking.ends_at < cutoff, Booking.is_active == False, Booking.id < newest_id)
+            .order_by(Booking.ends_at)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+
+        by_partition = {}
+        for booking_id, ends_at in batch:
+            by_partition.setdefault(partition_name(ends_at), []).append(booking_id)
+        for name, ids in by_partition.items():
+            table = archive_table(name)
+            table.create(db.connection(), checkfirst=True)
+            db.execute(insert(table).from_select(
+                columns, select(*[Booking.__table__.c[c] for c in columns]).where(Booking.id.in_(ids))
+            ))
+            partitions.add(name)
+        db.execute(delete(Booking).where(Booking.id.in_([booking_id for booking_id, _ in batch])))
+        db.commit()
+        archived += len(batch)
+
+    # Day bitmaps before the cutoff can no longer change
+    pruned = db.execute(delete(CaregiverDaySlots).where(CaregiverDaySlots.day < cutoff.date())).rowcount
+    db.commit()
+
+    return {
+        "archived": archived,
+        "partitions": sorted(partitions),
+        "pruned_day_slots": pruned,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+# 🔹 History Queries
+def booking_history(db: Session, conditions_for, columns, after_id=None, limit=None, date_from=None, date_to=None):
+    """Keyset page over the live table and every relevant partition, ordered by id.
+
+    `conditions_for(table)` returns the WHERE clauses for one table; each part is limited
+    on its own before the merge, so partitions contribute at most `limit` rows each.
+    """
+    tables = [Booking.__table__] + [archive_table(name) for name in list_partitions(db, date_from, date_to)]
+    parts = []
+    for table in tables:
+        part = select(*[table.c[c] for c in columns]).where(*conditions_for(table))
+        if after_id is not None:
+            part = part.where(table.c.id > after_id)
+        parts.append(select(part.order_by(table.c.id).limit(limit).subquery()))
+    merged = union_all(*parts).subquery()
+    return db.execute(select(merged).order_by(merged.c.id).limit(limit)).all()
@@ -0,0 +1,72 @@
+# Async counterparts of crud.py for PETCARE_ASYNC_DB mode. Each one runs the sync
+# implementation through AsyncSession.run_sync, so the query logic lives in one
+# place while the driver I/O is awaited on the event loop.
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import submit_hash_password
+from database import engine
+from group_commit import GROUP_COMMIT, group_committer
+import crud
+
+
+async def _write(db: AsyncSession, fn, *args):
+    """Async run_write: the crud write runs in `db`, or batched on the group-commit writer."""
+    if not GROUP_COMMIT:
+        return await db.run_sync(fn, *args)
+    # ✅ Release the request's connection first; its read lock would hold up the batch commit
+    await db.close()
+    return await asyncio.wrap_future(group_committer.submit(engine, fn, *args))
+
+
+async def get_user(db: AsyncSession, username: str):
+    return await db.run_sync(crud.get_user, username)
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user_by_id, user_id)
+
+async def create_user(db: AsyncSession, username: str, password: str):
+    hashed_pw = await asyncio.wrap_future(submit_hash_password(password))
+    return await _write(db, crud.create_user, username, hashed_pw)
+
+async def update_password_hash(db: AsyncSession, user_id: int, hashed_pw: str):
+    return await _write(db, crud.update_password_hash, user_id, hashed_pw)
+
+async def create_pet(db: AsyncSession, owner_id: int, name: str, pet_type: str):
+    return await _write(db, crud.create_pet, owner_id, name, pet_type)
+
+async def get_pets(db: AsyncSession, **filters):
+    return await db.run_sync(lambda session: crud.get_pets(session, **filters))
+
+async def adopt_pet(db: AsyncSession, user_id: int, pet_data):
+    return await _write(db, crud.adopt_pet, user_id, pet_data)
+
+async def create_caregiver(db: AsyncSession, caregiver):
+    hashed_password = await asyncio.wrap_future(submit_hash_password(caregiver.password))
+    return await _write(db, crud.create_caregiver, caregiver, hashed_password)
+
+async def get_caregivers(db: AsyncSession, **filters):
+    return await db.run_sync(lambda session: crud.get_caregivers(session, **filters))
+
+async def get_available_caregivers(db: AsyncSession, pet_type: str, date: str, time_from: str, time_to: str):
+    return await db.run_sync(crud.get_available_caregivers, pet_type, date, time_from, time_to)
+
+async def create_booking(db: AsyncSession, booking_data):
+    return await _write(db, crud.create_booking, booking_data)
+
+async def get_bookings(db: AsyncSession, **filters):
+    return await db.run_sync(lambda session: crud.get_bookings(session, **filters))
+
+async def create_review(db: AsyncSession, review_data, owner_id: int):
+    return await _write(db, crud.create_review, review_data, owner_id)
+
+async def get_reviews_by_caregiver(db: AsyncSession, caregiver_id: int):
+    return await db.run_sync(crud.get_reviews_by_caregiver, caregiver_id)
+
+async def get_rating_summary(db: AsyncSession, caregiver_id: int):
+    return await db.run_sync(crud.get_rating_summary, caregiver_id)
+
+async def get_leaderboard(db: AsyncSession, limit: int = 10, pet_type=None):
+    return await db.run_sync(crud.get_leaderboard, limit, pet_type)
+
+async def create_health_record(db: AsyncSession, pet_id: int, health_data):
+    return await _write(db, crud.create_health_record, pet_id, health_data)
@@ -0,0 +1,188 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from schemas import UserCreate, UserResponse, PetCreate, PetResponse, CaregiverResponse, CaregiverCreate, BookingCreate, BookingResponse, ReviewResponse, ReviewCreate, HealthRecordCreate, HealthRecordResponse
+from schemas import CaregiverRatingResponse, LeaderboardEntry
+from auth import create_access_token, verify_access_token, submit_hash_password, submit_verify_password, needs_rehash
+from crud import parse_fields, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from router import page_response
+from fast_json import list_fields
+from typing import List, Optional
+from datetime import date
+import asyncio
+import async_crud
+
+# Async handlers for the request path, mounted ahead of `router` when PETCARE_ASYNC_DB=1.
+# Routes not listed here (exports, bulk ingestion, manual expiry) keep their sync handlers.
+router = APIRouter()
+
+
+def _user_id_from_token(token: str) -> int:
+    payload = verify_access_token(token)
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication")
+    try:
+        return int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID in token")
+
+# 🔹 Users
+@router.post("/register/", response_model=UserResponse)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await async_crud.get_user(db, user.username):
+        raise HTTPException(status_code=400, detail="Username already registered")
+    await db.close()  # ✅ Hand the connection back while the password hashes
+    return await async_crud.create_user(db, user.username, user.password)
+
+@router.post("/login/")
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user(db, user.username)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    await db.close()  # ✅ Hand the connection back while the password is verified
+    if not await asyncio.wrap_future(submit_verify_password(user.password, db_user.hashed_password)):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if needs_rehash(db_user.hashed_password):
+        try:
+            rehashed = await asyncio.wrap_future(submit_hash_password(user.password))
+            await async_crud.update_password_hash(db, db_user.id, rehashed)
+        except HTTPException:
+            pass  # Pool is saturated; upgrade on a later login
+    token = create_access_token({"sub": str(db_user.id)})
+    return {"access_token": token, "token_type": "bearer"}
+
+@router.get("/me/", response_model=UserResponse)
+async def get_current_user(
+    token: str = Header(..., description="Authentication Token"), db: AsyncSession = Depends(get_async_db)
+):
+    db_user = await async_crud.get_user_by_id(db, _user_id_from_token(token))
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
+# 🔹 Pets
+@router.post("/pets/", response_model=PetResponse)
+async def add_pet(
+    pet: PetCreate,
+    token: str = Header(..., description="Authentication Token"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await async_crud.create_pet(db, _user_id_from_token(token), pet.name, pet.pet_type)
+
+@router.get("/pets/", response_model=list[PetResponse])
+async def list_pets(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    owner_id: Optional[int] = None,
+    pet_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    projection = list_fields(parse_fields(fields, PetResponse), PetResponse)
+    pets = await async_crud.get_pets(
+        db, after_id=after_id, limit=limit, owner_id=owner_id, pet_type=pet_type, fields=projection
+    )
+    return page_response(response, pets, limit, projection, PetResponse)
+
+@router.post("/adopt/", response_model=PetResponse)
+async def adopt_pet_route(
+    pet: PetCreate, token: str = Header(..., description="Authentication Token"), db: AsyncSession = Depends(get_async_db)
+):
+    return await async_crud.adopt_pet(db, _user_id_from_token(token), pet)
+
+@router.post("/pets/health_records", response_model=HealthRecordResponse)
+async def add_health_record(
+    pet_id: int,
+    health_data: HealthRecordCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),
+):
+    return await async_crud.create_health_record(db, pet_id, health_data)
+
+# 🔹 Caregivers
+@router.post("/caregivers", response_model=CaregiverResponse)
+async def register_caregiver(caregiver: CaregiverCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_caregiver(db, caregiver)
+
+@router.get("/caregivers", response_model=List[CaregiverResponse])
+async def list_caregivers(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    pet_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    projection = list_fields(parse_fields(fields, CaregiverResponse), CaregiverResponse)
+    caregivers = await async_crud.get_caregivers(
+        db, after_id=after_id, limit=limit, pet_type=pet_type, fields=projection
+    )
+    return page_response(response, caregivers, limit, projection, CaregiverResponse)
+
+@router.get("/caregivers/available", response_model=List[CaregiverResponse])
+async def list_available_caregivers(
+    pet_type: str, date: str, time_from: str, time_to: str, db: AsyncSession = Depends(get_async_db)
+):
+    return await async_crud.get_available_caregivers(db, pet_type, date, time_from, time_to)
+
+@router.get("/caregivers/reviews", response_model=List[ReviewResponse])
+async def get_caregiver_reviews(caregiver_id: int, db: AsyncSession = Depends(get_async_db)):
+    reviews = await async_crud.get_reviews_by_caregiver(db, caregiver_id)
+    if not reviews:
+        raise HTTPException(status_code=404, detail="No reviews found")
+    return reviews
+
+@router.get("/caregivers/rating", response_model=CaregiverRatingResponse)
+async def get_caregiver_rating(caregiver_id: int, db: AsyncSession = Depends(get_async_db)):
+    summary = await async_crud.get_rating_summary(db, caregiver_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="No reviews found")
+    return summary
+
+@router.get("/caregivers/leaderboard", response_model=List[LeaderboardEntry])
+async def caregiver_leaderboard(
+    limit: int = Query(10, ge=1, le=100), pet_type: Optional[str] = None, db: AsyncSession = Depends(get_async_db)
+):
+    return await async_crud.get_leaderboard(db, limit, pet_type)
+
+# 🔹 Bookings
+@router.post("/bookings/", response_model=BookingResponse)
+async def book_caregiver(booking: BookingCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_booking(db, booking)
+
+@router.get("/bookings/", response_model=list[BookingResponse])
+async def list_bookings(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    owner_id: Optional[int] = None,
+    caregiver_id: Optional[int] = None,
+    pet_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    projection = list_fields(parse_fields(fields, BookingResponse), BookingResponse)
+    bookings = await async_crud.get_bookings(
+        db, after_id=after_id, limit=limit, owner_id=owner_id, caregiver_id=caregiver_id,
+        pet_id=pet_id, date_from=date_from, date_to=date_to, fields=projection,
+        include_archived=include_archived,
+    )
+    return page_response(response, bookings, limit, projection, BookingResponse)
+
+# 🔹 Reviews
+@router.post("/reviews", response_model=ReviewResponse)
+async def submit_review(
+    review: ReviewCreate,
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Header(..., description="Authentication Token"),
+):
+    try:
+        owner_id = _user_id_from_token(token)
+    except HTTPException:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    return await async_crud.create_review(db, review, owner_id)
@@ -1,10 +1,16 @@
 import hashlib
 import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import jwt
 import datetime
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from typing import Dict
+from cache import LRUCache
 
 # Secret Key for JWT
 SECRET_KEY = "your_secret_key"
@@ -12,15 +18,104 @@ ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-# 🔹 Hash Password
+# Verified token payloads keyed by token digest; each entry expires with its token
+principal_cache = LRUCache(maxsize=10000)
+
+# 🔹 Password Hashing
+PBKDF2_ITERATIONS = 600_000
+HASH_SCHEME = "pbkdf2_sha256"
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations).hex()
+
 def hash_password(password: str) -> str:
-    """ Hashes a password using SHA-256 """
-    return hashlib.sha256(password.encode()).hexdigest()
+    """ Hashes a password with salted PBKDF2-SHA256 (deliberately slow; run it through the hash pool) """
+    salt = os.urandom(16)
+    return f"{HASH_SCHEME}${PBKDF2_ITERATIONS}${salt.hex()}${_pbkdf2(password, salt, PBKDF2_ITERATIONS)}"
 
-# 🔹 Verify Password
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """ Compares plain and hashed passwords """
-    return hmac.compare_digest(hash_password(plain_password), hashed_password)
+    """ Compares plain and hashed passwords, accepting legacy unsalted SHA-256 hashes """
+    if not hashed_password.startswith(HASH_SCHEME + "$"):
+        legacy = hashlib.sha256(plain_password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    _, iterations, salt, digest = hashed_password.split("$")
+    return hmac.compare_digest(_pbkdf2(plain_password, bytes.fromhex(salt), int(iterations)), digest)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """ True for legacy SHA-256 hashes or PBKDF2 hashes below the current work factor """
+    if not hashed_password.startswith(HASH_SCHEME + "$"):
+        return True
+    return int(hashed_password.split("$")[1]) < PBKDF2_ITERATIONS
+
+# 🔹 Hash Worker Pool
+# Hashing runs in separate processes so a login burst can't starve request workers.
+# At most HASH_WORKERS + HASH_QUEUE_SIZE jobs are admitted; the rest get a fast 503.
+# Handlers await the jobs without holding a DB connection or a threadpool thread. Keep
+# admission well below AnyIO's 40 threadpool tokens anyway, so a burst is shed early.
+HASH_WORKERS = int(os.getenv("PETCARE_HASH_WORKERS", "2"))
+HASH_QUEUE_SIZE = int(os.getenv("PETCARE_HASH_QUEUE_SIZE", "6"))
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+# ✅ The pool starts lazily in a process that already runs threads (group commit, scheduler,
+# leader election, AnyIO workers); forking one could copy a held lock into the child
+HASH_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context(HASH_START_METHOD)
+            )
+        return _hash_pool
+
+def _discard_hash_pool(pool):
+    """Drops a broken pool so the next job starts a fresh one."""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is pool:
+            _hash_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_hash_pool():
+    """Stops the worker processes; called when the app shuts down."""
+    global _hash_pool
+    with _hash_pool_lock:
+        pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _submit_hash_job(fn, *args) -> Future:
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        pool = _get_hash_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); without a new pool every later login would fail
+            _discard_hash_pool(pool)
+            future = _get_hash_pool().submit(fn, *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+def submit_hash_password(password: str) -> Future:
+    """ Queues hash_password on the worker pool; raises 503 when the queue is full """
+    return _submit_hash_job(hash_password, password)
+
+def submit_verify_password(plain_password: str, hashed_password: str) -> Future:
+    """ Queues verify_password on the worker pool; raises 503 when the queue is full """
+    return _submit_hash_job(verify_password, plain_password, hashed_password)
 
 # 🔹 Create JWT Token
 def create_access_token(data: dict, expires_delta: int = 60):
@@ -41,6 +136,11 @@ def create_access_token(data: dict, expires_delta: int = 60):
 # 🔹 Verify JWT Token
 def verify_access_token(token: str = Depends(oauth2_scheme)):
     """Verifies JWT token and returns payload."""
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    cached = principal_cache.get(digest)
+    if cached is not None:
+        return dict(cached)  # ✅ Copy so callers can't mutate the cached payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
@@ -48,6 +148,7 @@ def verify_access_token(token: str = Depends(oauth2_scheme)):
         if "sub" in payload:
             payload["sub"] = str(payload["sub"])  
 
+        principal_cache.set(digest, dict(payload), expires_at=payload.get("exp"))
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -0,0 +1,90 @@
+from sqlalchemy.orm import Session
+from models import Booking, CaregiverDaySlots
+from datetime import datetime, date, timedelta
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+
+# 🔹 Slot math
+def slot_mask(starts_at: datetime, ends_at: datetime) -> int:
+    """Returns the bitmap of 15-minute slots touched by [starts_at, ends_at) within one day."""
+    first = (starts_at.hour * 60 + starts_at.minute) // SLOT_MINUTES
+    end_minutes = ends_at.hour * 60 + ends_at.minute
+    last = min(-(-end_minutes // SLOT_MINUTES), SLOTS_PER_DAY)  # Round partial slots up
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def to_bitmap(mask: int) -> bytes:
+    return mask.to_bytes(BITMAP_BYTES, "little")
+
+def from_bitmap(busy: bytes) -> int:
+    return int.from_bytes(busy, "little")
+
+# 🔹 Maintenance
+def mark_booking_slots(db: Session, caregiver_id: int, starts_at: datetime, ends_at: datetime):
+    """ORs a booking's slots into the caregiver's bitmap for that day (caller commits)."""
+    row = db.get(CaregiverDaySlots, (caregiver_id, starts_at.date()))
+    if row is None:
+        row = CaregiverDaySlots(caregiver_id=caregiver_id, day=starts_at.date(), busy=to_bitmap(0))
+        db.add(row)
+    row.busy = to_bitmap(from_bitmap(row.busy) | slot_mask(starts_at, ends_at))
+
+def mark_slots_bulk(db: Session, windows):
+    """Marks many (caregiver_id, starts_at, ends_at) windows with one read per caregiver-day (caller commits)."""
+    masks = {}
+    for caregiver_id, starts_at, ends_at in windows:
+        key = (caregiver_id, starts_at.date())
+        masks[key] = masks.get(key, 0) | slot_mask(starts_at, ends_at)
+    for (caregiver_id, day), mask in masks.items():
+        row = db.get(CaregiverDaySlots, (caregiver_id, day))
+        if row is None:
+            db.add(CaregiverDaySlots(caregiver_id=caregiver_id, day=day, busy=to_bitmap(mask)))
+        else:
+            row.busy = to_bitmap(from_bitmap(row.busy) | mask)
+
+def rebuild_day_slots(db: Session, caregiver_id: int, day: date):
+    """Recomputes one caregiver-day bitmap from its active bookings (caller commits)."""
+    windows = db.query(Booking.starts_at, Booking.ends_at).filter(
+        Booking.caregiver_id == caregiver_id,
+        Booking.starts_at >= datetime.combine(day, datetime.min.time()),
+        Booking.starts_at < datetime.combine(day + timedelta(days=1), datetime.min.time()),
+        Booking.is_active == True,
+    ).all()
+    mask = 0
+    for starts_at, ends_at in windows:
+        mask |= slot_mask(starts_at, ends_at)
+
+    row = db.get(CaregiverDaySlots, (caregiver_id, day))
+    if mask == 0:
+        if row is not None:
+            db.delete(row)  # ✅ Keep the table limited to days that have bookings
+    elif row is None:
+        db.add(CaregiverDaySlots(caregiver_id=caregiver_id, day=day, busy=to_bitmap(mask)))
+    else:
+        row.busy = to_bitmap(mask)
+
+def ensure_slot_bitmaps(db: Session):
+    """Builds bitmaps for active bookings once, when the table is still empty."""
+    if db.query(CaregiverDaySlots.caregiver_id).first() is not None:
+        return 0
+    bookings = db.query(Booking.caregiver_id, Booking.starts_at, Booking.ends_at).filter(
+        Booking.is_active == True, Booking.starts_at.isnot(None)
+    ).all()
+    # ✅ One row per caregiver-day: marking booking by booking would add the same day twice before a flush
+    mark_slots_bulk(db, bookings)
+    db.commit()
+    return len(bookings)
+
+# 🔹 Queries
+def free_caregiver_ids(db: Session, candidate_ids, starts_at: datetime, ends_at: datetime):
+    """Filters candidates down to those with no busy slot in the requested window."""
+    wanted = slot_mask(starts_at, ends_at)
+    busy = dict(
+        db.query(CaregiverDaySlots.caregiver_id, CaregiverDaySlots.busy).filter(
+            CaregiverDaySlots.day == starts_at.date(),
+            CaregiverDaySlots.caregiver_id.in_(candidate_ids),
+        ).all()
+    )
+    return [cid for cid in candidate_ids if cid not in busy or not from_bitmap(busy[cid]) & wanted]
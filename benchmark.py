@@ -0,0 +1,461 @@
+"""Load-test and latency benchmark for the Pet Care API.
+
+    python benchmark.py run --scale 1000 --concurrency 32 --requests 5000 --output run.json
+    python benchmark.py run --uvicorn --workers 4 --workload mix.jsonl
+    python benchmark.py compare baseline.json run.json --max-regression 0.10
+    python benchmark.py serialize --scale 5000 --limit 1000
+    python benchmark.py startup --scale 1000 --restarts 5
+
+`run` seeds a fresh database in a temporary directory, replays a weighted mix of
+API calls against the app (in-process through ASGI, or under a uvicorn
+subprocess) and prints per-route throughput and p50/p95/p99 latency as JSON.
+A workload file is JSONL with one `{"op": "...", "weight": N}` object per line.
+`compare` diffs two result files and exits non-zero on a throughput regression.
+`serialize` times the list endpoints with and without the fast serialization path.
+`startup` times app startup (per phase) in fresh processes: the first migrates, restarts don't.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_PASSWORD = "bench-password"
+PET_TYPES = ["dog", "cat", "fish", "parrot"]
+
+DEFAULT_WORKLOAD = {
+    "register": 2,
+    "login": 3,
+    "me": 10,
+    "list_pets": 20,
+    "add_pet": 5,
+    "list_caregivers": 15,
+    "list_bookings": 20,
+    "create_booking": 10,
+    "submit_review": 5,
+    "caregiver_reviews": 10,
+}
+
+# 🔹 Seeding
+def seed_database(scale: int):
+    """Creates tables in the current directory's petcare.db and bulk-inserts `scale`-proportional rows."""
+    from sqlalchemy import insert
+    from database import engine, Base
+    from auth import hash_password
+    from models import User, Pet, Caregiver, CaregiverPetType, Booking, Review
+
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password(BENCH_PASSWORD)  # One slow hash, shared by every seeded account
+    rng = random.Random(42)
+    n_users, n_caregivers = scale, max(scale // 10, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "hashed_password": hashed} for i in range(1, n_users + 1)
+        ])
+        caregivers, pet_type_rows = [], []
+        for i in range(1, n_caregivers + 1):
+            types = rng.sample(PET_TYPES, 2)
+            caregivers.append({
+                "id": i, "username": f"caregiver{i}", "hashed_password": hashed,
+                "pet_types": ", ".join(types), "is_active": True,
+            })
+            pet_type_rows += [{"caregiver_id": i, "pet_type": t} for t in types]
+        conn.execute(insert(Caregiver), caregivers)
+        conn.execute(insert(CaregiverPetType), pet_type_rows)
+        conn.execute(insert(Pet), [
+            {"id": i, "name": f"pet{i}", "pet_type": rng.choice(PET_TYPES), "owner_id": (i - 1) // 2 + 1}
+            for i in range(1, 2 * n_users + 1)
+        ])
+
+        # One non-overlapping 10:00-11:00 booking per caregiver per day
+        start = datetime.combine(date.today() - timedelta(days=scale // n_caregivers), datetime.min.time())
+        bookings = []
+        for i in range(5 * scale):
+            caregiver_id = i % n_caregivers + 1
+            day = start + timedelta(days=i // n_caregivers)
+            starts_at, ends_at = day.replace(hour=10), day.replace(hour=11)
+            bookings.append({
+                "pet_id": rng.randint(1, 2 * n_users), "caregiver_id": caregiver_id,
+                "date": day.strftime("%Y-%m-%d"), "time_from": "10:00 AM", "time_to": "11:00 AM",
+                "starts_at": starts_at, "ends_at": ends_at, "is_active": ends_at > datetime.now(),
+            })
+        conn.execute(insert(Booking), bookings)
+        conn.execute(insert(Review), [
+            {"caregiver_id": rng.randint(1, n_caregivers), "owner_id": rng.randint(1, n_users),
+             "rating": rng.randint(1, 5), "comment": "seeded review"}
+            for _ in range(2 * scale)
+        ])
+    return {"users": n_users, "caregivers": n_caregivers, "pets": 2 * n_users}
+
+# 🔹 Workload
+def load_workload(path: str):
+    if not path:
+        return dict(DEFAULT_WORKLOAD)
+    workload = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry["op"] not in OPERATIONS:
+                    raise SystemExit(f"Unknown op {entry['op']!r}; choose from {', '.join(OPERATIONS)}")
+                workload[entry["op"]] = float(entry.get("weight", 1))
+    return workload
+
+class BenchState:
+    def __init__(self, seeded, tokens, rng):
+        self.seeded = seeded
+        self.tokens = tokens
+        self.rng = rng
+        self.counter = 0
+
+    def user_id(self):
+        return self.rng.randint(1, self.seeded["users"])
+
+    def token(self):
+        return self.rng.choice(self.tokens)
+
+    def unique(self):
+        self.counter += 1
+        return f"{os.getpid()}-{time.monotonic_ns()}-{self.counter}"
+
+async def op_register(client, state):
+    return await client.post("/register/", json={"username": f"bench-{state.unique()}", "password": BENCH_PASSWORD})
+
+async def op_login(client, state):
+    return await client.post("/login/", json={"username": f"user{state.user_id()}", "password": BENCH_PASSWORD})
+
+async def op_me(client, state):
+    return await client.get("/me/", headers={"token": state.token()})
+
+async def op_list_pets(client, state):
+    return await client.get("/pets/", params={"owner_id": state.user_id()})
+
+async def op_add_pet(client, state):
+    pet = {"name": "bench", "pet_type": state.rng.choice(PET_TYPES)}
+    return await client.post("/pets/", json=pet, headers={"token": state.token()})
+
+async def op_list_caregivers(client, state):
+    return await client.get("/caregivers", params={"pet_type": state.rng.choice(PET_TYPES), "limit": 20})
+
+async def op_list_bookings(client, state):
+    return await client.get("/bookings/", params={"caregiver_id": state.rng.randint(1, state.seeded["caregivers"])})
+
+async def op_create_booking(client, state):
+    day = date.today() + timedelta(days=state.rng.randint(365, 3650))
+    hour = state.rng.randint(1, 11)
+    booking = {
+        "pet_id": state.rng.randint(1, state.seeded["pets"]),
+        "caregiver_id": state.rng.randint(1, state.seeded["caregivers"]),
+        "date": day.isoformat(), "time_from": f"{hour:02d}:00 AM", "time_to": f"{hour:02d}:30 AM",
+    }
+    return await client.post("/bookings/", json=booking)
+
+async def op_submit_review(client, state):
+    review = {"caregiver_id": state.rng.randint(1, state.seeded["caregivers"]), "rating": state.rng.randint(1, 5), "comment": "bench"}
+    return await client.post("/reviews", json=review, headers={"token": state.token()})
+
+async def op_caregiver_reviews(client, state):
+    return await client.get("/caregivers/reviews", params={"caregiver_id": state.rng.randint(1, state.seeded["caregivers"])})
+
+OPERATIONS = {
+    "register": op_register,
+    "login": op_login,
+    "me": op_me,
+    "list_pets": op_list_pets,
+    "add_pet": op_add_pet,
+    "list_caregivers": op_list_caregivers,
+    "list_bookings": op_list_bookings,
+    "create_booking": op_create_booking,
+    "submit_review": op_submit_review,
+    "caregiver_reviews": op_caregiver_reviews,
+}
+
+# 🔹 Measurement
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    """samples: list of (op, latency_seconds, status or None)."""
+    routes = {}
+    for op, latency, status in samples:
+        route = routes.setdefault(op, {"latencies": [], "statuses": {}})
+        route["latencies"].append(latency)
+        key = str(status) if status is not None else "transport_error"
+        route["statuses"][key] = route["statuses"].get(key, 0) + 1
+
+    def stats(latencies, statuses):
+        latencies = sorted(latencies)
+        errors = sum(n for s, n in statuses.items() if s == "transport_error" or int(s) >= 500)
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "statuses": statuses,
+        }
+
+    all_statuses = {}
+    for route in routes.values():
+        for s, n in route["statuses"].items():
+            all_statuses[s] = all_statuses.get(s, 0) + n
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": stats([latency for _, latency, _ in samples], all_statuses),
+        "routes": {op: stats(r["latencies"], r["statuses"]) for op, r in sorted(routes.items())},
+    }
+
+async def replay(client, workload, state, total, concurrency):
+    ops, weights = zip(*workload.items())
+    schedule = state.rng.choices(ops, weights=weights, k=total)
+    samples, position = [], iter(schedule)
+
+    async def worker():
+        for op in position:
+            started = time.perf_counter()
+            try:
+                response = await OPERATIONS[op](client, state)
+                status = response.status_code
+            except Exception:
+                status = None
+            samples.append((op, time.perf_counter() - started, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+async def collect_tokens(client, seeded, count):
+    tokens = []
+    for user_id in range(1, min(count, seeded["users"]) + 1):
+        response = await client.post("/login/", json={"username": f"user{user_id}", "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+# 🔹 Runners
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _start_uvicorn(workdir, workers):
+    port = _free_port()
+    env = {**os.environ, "PYTHONPATH": REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+async def _wait_until_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Server did not become ready in time")
+
+async def _run(args):
+    import httpx
+
+    workload = load_workload(args.workload)
+    workdir = tempfile.mkdtemp(prefix="petcare-bench-")
+    os.chdir(workdir)  # database.py resolves ./petcare.db against the working directory
+    sys.path.insert(0, REPO_DIR)
+
+    seed_started = time.perf_counter()
+    seeded = seed_database(args.scale)
+    seed_elapsed = time.perf_counter() - seed_started
+
+    process = None
+    lifespan = contextlib.nullcontext()
+    if args.uvicorn:
+        process, base_url = _start_uvicorn(workdir, args.workers)
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        from main import app
+        lifespan = app.router.lifespan_context(app)  # ✅ ASGITransport doesn't send lifespan events
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    try:
+        async with lifespan, client:
+            await _wait_until_ready(client)
+            state = BenchState(seeded, await collect_tokens(client, seeded, 20), random.Random(args.seed))
+            result = await replay(client, workload, state, args.requests, args.concurrency)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    result["config"] = {
+        "mode": "uvicorn" if args.uvicorn else "in-process",
+        "workers": args.workers if args.uvicorn else 1,
+        "scale": args.scale,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "workload": workload,
+        "seed_s": round(seed_elapsed, 3),
+        "env": {k: v for k, v in os.environ.items() if k.startswith("PETCARE_")},
+    }
+    return result
+
+def run(args):
+    result = asyncio.run(_run(args))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+# 🔹 Serialization Benchmark
+SERIALIZE_ROUTES = {"list_pets": "/pets/", "list_caregivers": "/caregivers", "list_bookings": "/bookings/"}
+
+async def _serialize(args):
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix="petcare-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    seed_database(args.scale)
+
+    import fast_json
+    from response_cache import CACHED_ROUTES
+    from main import app
+    CACHED_ROUTES.clear()  # Measure serialization, not the response cache
+
+    results = {}
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name, path in SERIALIZE_ROUTES.items():
+            timings, bodies = {}, {}
+            for mode in ("standard", "fast"):
+                fast_json.FAST_SERIALIZATION = mode == "fast"
+                latencies = []
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    response = await client.get(path, params={"limit": args.limit})
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+                bodies[mode] = response.json()
+                latencies.sort()
+                timings[mode] = {"p50_ms": round(percentile(latencies, 50) * 1000, 3), "rows": len(bodies[mode])}
+            results[name] = {
+                **timings,
+                "speedup": round(timings["standard"]["p50_ms"] / timings["fast"]["p50_ms"], 2),
+                "identical": bodies["standard"] == bodies["fast"],
+            }
+    return {"routes": results, "config": {"scale": args.scale, "limit": args.limit, "iterations": args.iterations}}
+
+def serialize(args):
+    print(json.dumps(asyncio.run(_serialize(args)), indent=2))
+
+# 🔹 Startup Benchmark
+STARTUP_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        print(json.dumps({"wall_ms": (time.perf_counter() - started) * 1000,
+                          **{phase: seconds * 1000 for phase, seconds in main.startup_timings.items()}}))
+asyncio.run(start())
+"""
+
+def startup(args):
+    """Starts the app in fresh processes against one seeded database; the first start migrates."""
+    workdir = tempfile.mkdtemp(prefix="petcare-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    seed_database(args.scale)
+
+    env = {**os.environ, "PYTHONPATH": REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    runs = []
+    for _ in range(args.restarts + 1):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append({phase: round(ms, 3) for phase, ms in json.loads(output.splitlines()[-1]).items()})
+    restarts = runs[1:]
+    summary = {
+        phase: round(percentile(sorted(run[phase] for run in restarts), 50), 3)
+        for phase in restarts[0]
+    } if restarts else {}
+    print(json.dumps({"first_start_ms": runs[0], "restart_p50_ms": summary, "config": {"scale": args.scale, "restarts": args.restarts}}, indent=2))
+
+# 🔹 Comparison
+def compare(args):
+    """Diffs two result files; exits 1 if overall or any route's throughput dropped by more than the threshold."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    def delta(before, after):
+        return round((after - before) / before, 4) if before else None
+
+    report, regressions = {}, []
+    pairs = {"overall": (baseline["overall"], candidate["overall"])}
+    pairs.update({op: (baseline["routes"][op], candidate["routes"][op]) for op in baseline["routes"] if op in candidate["routes"]})
+    for name, (before, after) in pairs.items():
+        entry = {metric: {"baseline": before[metric], "candidate": after[metric], "change": delta(before[metric], after[metric])}
+                 for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")}
+        report[name] = entry
+        change = entry["throughput_rps"]["change"]
+        if change is not None and change < -args.max_regression:
+            regressions.append(name)
+
+    print(json.dumps({"regressions": regressions, "max_regression": args.max_regression, "routes": report}, indent=2))
+    sys.exit(1 if regressions else 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a database and replay a workload")
+    run_parser.add_argument("--scale", type=int, default=1000, help="Seeded users; other tables scale from it")
+    run_parser.add_argument("--requests", type=int, default=2000)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--workload", help="JSONL file of {\"op\": ..., \"weight\": ...} lines")
+    run_parser.add_argument("--uvicorn", action="store_true", help="Serve the app from a uvicorn subprocess")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--output", help="Also write the JSON result to this file")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Diff two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed throughput drop (0.10 = 10%%)")
+    compare_parser.set_defaults(func=compare)
+
+    serialize_parser = commands.add_parser("serialize", help="Compare standard and fast list serialization")
+    serialize_parser.add_argument("--scale", type=int, default=5000, help="Seeded users; other tables scale from it")
+    serialize_parser.add_argument("--limit", type=int, default=1000, help="Rows per list response")
+    serialize_parser.add_argument("--iterations", type=int, default=50)
+    serialize_parser.set_defaults(func=serialize)
+
+    startup_parser = commands.add_parser("startup", help="Time cold starts and restarts of the app")
+    startup_parser.add_argument("--scale", type=int, default=1000, help="Seeded users; other tables scale from it")
+    startup_parser.add_argument("--restarts", type=int, default=5)
+    startup_parser.set_defaults(func=startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU map with optional per-entry expiry and hit/miss counters.
+
+    Entries may carry a weight (e.g. bytes); when `maxweight` is set, least recently
+    used entries are evicted until the total weight fits as well as the entry count.
+    """
+
+    def __init__(self, maxsize: int = 1024, maxweight: int = None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at or None, weight)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)  # ✅ Expired entries are dropped on read
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: float = None, weight: int = 1):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at, weight)
+            self.weight += weight
+            while len(self._entries) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight and self._entries
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "weight": self.weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
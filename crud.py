@@ -1,35 +1,112 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, case, event, func, insert, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import IntegrityError
-from auth import hash_password
-from models import User, Pet, Caregiver, Booking, Review, HealthRecord
-from schemas import PetCreate, CaregiverCreate, BookingCreate, ReviewCreate,  HealthRecordCreate
+from models import User, Pet, Caregiver, CaregiverPetType, CaregiverRating, Booking, Review, HealthRecord, SweepState
+from schemas import PetCreate, CaregiverCreate, BookingCreate, ReviewCreate,  HealthRecordCreate, UserResponse, BookingResponse
+from availability import mark_booking_slots, mark_slots_bulk, rebuild_day_slots, free_caregiver_ids
+from cache import LRUCache
+from response_cache import invalidate as invalidate_responses
+from scheduler import expiry_scheduler
+from search import index_reviews, index_health_records
+from group_commit import on_commit
+from events import booking_events, booking_change_events, publish_booking_changes
+from archive import booking_history
 from fastapi import HTTPException
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from typing import Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("petcare.crud")
 
 # 🔹 Get User by Username
 def get_user(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
+# 🔹 Get User by ID (cached)
+# Snapshots of user rows for authenticated requests; dropped whenever a user row changes
+user_cache = LRUCache(maxsize=10000)
+
+def get_user_by_id(db: Session, user_id: int):
+    """Returns a UserResponse for `user_id`, reading the DB only on a cache miss."""
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    db_user = db.get(User, user_id)
+    if db_user is None:
+        return None
+    snapshot = UserResponse.model_validate(db_user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
 # 🔹 Create User
-def create_user(db: Session, username: str, password: str):
-    hashed_pw = hash_password(password)
+def create_user(db: Session, username: str, hashed_pw: str):
+    # ✅ Callers hash on the worker pool before opening a transaction
     new_user = User(username=username, hashed_password=hashed_pw)
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
     return new_user
 
+# 🔹 Replace a Legacy Password Hash
+def update_password_hash(db: Session, user_id: int, hashed_pw: str):
+    user = db.get(User, user_id)
+    user.hashed_password = hashed_pw
+    db.commit()
+
 # 🔹 Create Pet
 def create_pet(db: Session, owner_id: int, name: str, pet_type: str):
     new_pet = Pet(name=name, owner_id=owner_id, pet_type=pet_type)
     db.add(new_pet)
     db.commit()
-    db.refresh(new_pet)
+    on_commit(db, invalidate_responses, "pets")
     return new_pet
 
+# 🔹 Pagination Helpers
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def parse_fields(fields: Optional[str], schema):
+    """Validates a comma-separated `fields=` projection against a response schema."""
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def _select(db: Session, model, fields):
+    """Queries whole ORM objects, or only the projected columns (plus `id` for the cursor)."""
+    if fields is None:
+        return db.query(model)
+    return db.query(*[getattr(model, f) for f in dict.fromkeys(["id", *fields])])
+
+def _keyset_page(query, model, after_id: Optional[int], limit: Optional[int]):
+    """Returns the next `limit` rows ordered by id, starting after the `after_id` cursor."""
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    return query.order_by(model.id).limit(limit).all()
+
+def _pet_type_filter(pet_type: str):
+    """Matches caregivers taking `pet_type` through the caregiver_pet_types index."""
+    return Caregiver.id.in_(select(CaregiverPetType.caregiver_id).where(CaregiverPetType.pet_type == pet_type))
+
 # 🔹 Get All Pets
-def get_pets(db: Session):
-    return db.query(Pet).all()
+def get_pets(db: Session, after_id: Optional[int] = None, limit: Optional[int] = None,
+             owner_id: Optional[int] = None, pet_type: Optional[str] = None, fields=None):
+    query = _select(db, Pet, fields)
+    if owner_id is not None:
+        query = query.filter(Pet.owner_id == owner_id)
+    if pet_type is not None:
+        query = query.filter(Pet.pet_type == pet_type)
+    return _keyset_page(query, Pet, after_id, limit)
 
 def adopt_pet(db: Session, user_id: int, pet_data: PetCreate):
     """Allows a user to adopt a pet but limits them to 2 pets max."""
@@ -39,42 +116,112 @@ def adopt_pet(db: Session, user_id: int, pet_data: PetCreate):
         raise HTTPException(status_code=404, detail="User not found")
 
     # Check if the user already owns 2 pets
-    if len(user.pets) >= 2:
+    # ✅ Counted on the pets.owner_id index instead of loading the whole collection
+    owned = db.query(func.count(Pet.id)).filter(Pet.owner_id == user.id).scalar()
+    if owned >= 2:
         raise HTTPException(status_code=400, detail="You can only adopt up to 2 pets")
 
     # ✅ Assign `owner_id` automatically
     pet = Pet(name=pet_data.name, pet_type=pet_data.pet_type, owner_id=user_id)
     db.add(pet)
     db.commit()
-    db.refresh(pet)
+    on_commit(db, invalidate_responses, "pets")
     return pet
 
+# 🔹 Owner Dashboard
+def get_owner_dashboard(db: Session, user_id: int):
+    """Loads an owner with their pets, health records and upcoming bookings in four queries."""
+    user = db.query(User).options(
+        selectinload(User.pets).selectinload(Pet.health_record)
+    ).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    pets = sorted(user.pets, key=lambda pet: pet.id)
+    upcoming = {pet.id: [] for pet in pets}
+    if pets:
+        bookings = db.query(Booking).options(
+            joinedload(Booking.caregiver).load_only(Caregiver.username)
+        ).filter(
+            Booking.pet_id.in_(upcoming), Booking.is_active == True, Booking.ends_at > datetime.now()
+        ).order_by(Booking.starts_at)
+        for booking in bookings:
+            upcoming[booking.pet_id].append({
+                "id": booking.id,
+                "pet_id": booking.pet_id,
+                "caregiver_id": booking.caregiver_id,
+                "caregiver_name": booking.caregiver.username,
+                "date": booking.date,
+                "time_from": booking.time_from,
+                "time_to": booking.time_to,
+            })
+
+    return {
+        "id": user.id,
+        "username": user.username,
+        "pets": [
+            {
+                "id": pet.id,
+                "name": pet.name,
+                "pet_type": pet.pet_type,
+                "owner_id": pet.owner_id,
+                "health_record": pet.health_record,
+                "upcoming_bookings": upcoming[pet.id],
+            }
+            for pet in pets
+        ],
+    }
+
 # 🔹 Create Caregiver
-def create_caregiver(db: Session, caregiver: CaregiverCreate):
+def get_caregiver(db: Session, username: str):
+    return db.query(Caregiver).filter(Caregiver.username == username).first()
+
+def create_caregiver(db: Session, caregiver: CaregiverCreate, hashed_password: str):
     existing_caregiver = db.query(Caregiver).filter(Caregiver.username == caregiver.username).first()
 
     if existing_caregiver:
         raise HTTPException(status_code=400, detail="A caregiver with this username already exists")
 
-    hashed_password = hash_password(caregiver.password)  # Ensure password is hashed
-
     db_caregiver = Caregiver(
         username=caregiver.username,
         hashed_password=hashed_password,  # ✅ Store only hashed password
         pet_types=caregiver.pet_types,
-        is_active=True
+        is_active=True,
+        pet_type_entries=[CaregiverPetType(pet_type=pet_type) for pet_type in split_pet_types(caregiver.pet_types)]
     )
 
     db.add(db_caregiver)
     db.commit()
-    db.refresh(db_caregiver)
+    on_commit(db, invalidate_responses, "caregivers")
 
     return db_caregiver  # ✅ No password field in response
 
 
+def split_pet_types(pet_types: str):
+    """Splits the comma-separated `pet_types` string into distinct, trimmed entries."""
+    return list(dict.fromkeys(p.strip() for p in pet_types.split(",") if p.strip()))
+
+def ensure_pet_type_index(db: Session):
+    """Fills caregiver_pet_types from `Caregiver.pet_types` once, when the table is still empty."""
+    if db.query(CaregiverPetType.caregiver_id).first() is not None:
+        return 0
+    rows = [
+        {"caregiver_id": caregiver_id, "pet_type": pet_type}
+        for caregiver_id, pet_types in db.query(Caregiver.id, Caregiver.pet_types).all()
+        for pet_type in split_pet_types(pet_types)
+    ]
+    if rows:
+        db.execute(insert(CaregiverPetType), rows)
+    db.commit()
+    return len(rows)
+
 # 🔹 Get Available Caregivers
-def get_caregivers(db: Session):
-    return db.query(Caregiver).all()
+def get_caregivers(db: Session, after_id: Optional[int] = None, limit: Optional[int] = None,
+                   pet_type: Optional[str] = None, fields=None):
+    query = _select(db, Caregiver, fields)
+    if pet_type is not None:
+        query = query.filter(_pet_type_filter(pet_type))
+    return _keyset_page(query, Caregiver, after_id, limit)
 
 # 🔹Create booking
 def create_booking(db: Session, booking_data: BookingCreate):
@@ -86,57 +233,214 @@ def create_booking(db: Session, booking_data: BookingCreate):
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
 
-    allowed_pet_types = caregiver.pet_types.split(", ")
-    if pet.pet_type not in allowed_pet_types:
+    takes_pet_type = db.query(CaregiverPetType.caregiver_id).filter(
+        CaregiverPetType.caregiver_id == caregiver.id, CaregiverPetType.pet_type == pet.pet_type
+    ).first()
+    if not takes_pet_type:
         raise HTTPException(status_code=400, detail=f"Caregiver does not take care of {pet.pet_type}")
 
+    window = parse_booking_window(booking_data.date, booking_data.time_from, booking_data.time_to)
+    if window is None:
+        raise HTTPException(status_code=400, detail="Invalid date/time format, expected YYYY-MM-DD and HH:MM AM/PM")
+    starts_at, ends_at = window
+    if ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="Booking must end after it starts")
+
+    # ✅ Bookings never span more than a day, so the probe only reads a bounded slice of the index
+    conflict = db.query(Booking.id).filter(
+        Booking.caregiver_id == booking_data.caregiver_id,
+        Booking.starts_at > starts_at - MAX_BOOKING_LENGTH,
+        Booking.starts_at < ends_at,
+        Booking.ends_at > starts_at,
+        Booking.is_active == True,
+    ).first()
+    if conflict:
+        raise HTTPException(status_code=409, detail="Caregiver is already booked for this time slot")
+
     new_booking = Booking(
         pet_id=booking_data.pet_id,
         caregiver_id=booking_data.caregiver_id,
         date=booking_data.date,
         time_from=booking_data.time_from,
-        time_to=booking_data.time_to
+        time_to=booking_data.time_to,
+        starts_at=starts_at,
+        ends_at=ends_at,
+        # ✅ A booking that already ended is behind the sweep watermark, so expire it now
+        is_active=ends_at > datetime.now()
     )
     db.add(new_booking)
+    if new_booking.is_active:
+        mark_booking_slots(db, new_booking.caregiver_id, starts_at, ends_at)
     db.commit()
-    db.refresh(new_booking)
+    if new_booking.is_active:
+        on_commit(db, expiry_scheduler.schedule, new_booking.id, ends_at)
+    on_commit(db, publish_booking_changes, "created", [new_booking], {pet.id: pet.owner_id})
     return new_booking
 
+# 🔹 Find Available Caregivers
+def get_available_caregivers(db: Session, pet_type: str, date: str, time_from: str, time_to: str):
+    """Returns active caregivers for `pet_type` with no booked slot between time_from and time_to."""
+    window = parse_booking_window(date, time_from, time_to)
+    if window is None:
+        raise HTTPException(status_code=400, detail="Invalid date/time format, expected YYYY-MM-DD and HH:MM AM/PM")
+    starts_at, ends_at = window
+    if ends_at <= starts_at:
+        raise HTTPException(status_code=400, detail="Window must end after it starts")
+
+    candidates = db.query(Caregiver).filter(Caregiver.is_active == True, _pet_type_filter(pet_type)).all()
+    free_ids = set(free_caregiver_ids(db, [caregiver.id for caregiver in candidates], starts_at, ends_at))
+    return [caregiver for caregiver in candidates if caregiver.id in free_ids]
+
 # 🔹 Get All Bookings
-def get_bookings(db: Session):
-    return db.query(Booking).all()
+def _booking_conditions(table, owner_id=None, caregiver_id=None, pet_id=None, date_from=None, date_to=None):
+    """WHERE clauses for a booking listing, for the live table or an archive partition."""
+    c = table.c
+    conditions = []
+    if owner_id is not None:
+        conditions.append(c.pet_id.in_(select(Pet.id).where(Pet.owner_id == owner_id)))
+    if caregiver_id is not None:
+        conditions.append(c.caregiver_id == caregiver_id)
+    if pet_id is not None:
+        conditions.append(c.pet_id == pet_id)
+    if date_from is not None:
+        conditions.append(c.starts_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to is not None:
+        conditions.append(c.starts_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+def get_bookings(db: Session, after_id: Optional[int] = None, limit: Optional[int] = None,
+                 owner_id: Optional[int] = None, caregiver_id: Optional[int] = None, pet_id: Optional[int] = None,
+                 date_from: Optional[date] = None, date_to: Optional[date] = None, fields=None,
+                 include_archived: bool = False):
+    filters = dict(owner_id=owner_id, caregiver_id=caregiver_id, pet_id=pet_id, date_from=date_from, date_to=date_to)
+    if include_archived:
+        # ✅ History reads merge the live table with the archive partitions the date range can touch
+        columns = list(dict.fromkeys(["id", *fields])) if fields else list(BookingResponse.model_fields)
+        return booking_history(
+            db, lambda table: _booking_conditions(table, **filters), columns,
+            after_id=after_id, limit=limit, date_from=date_from, date_to=date_to,
+        )
+    query = _select(db, Booking, fields).filter(*_booking_conditions(Booking.__table__, **filters))
+    return _keyset_page(query, Booking, after_id, limit)
 
 current_datetime = datetime.now()
 current_date = current_datetime.date()  # Extracts YYYY-MM-DD
 current_time = current_datetime.time()  # Extracts HH:MM:SS
 
 
-def update_expired_availability(db):
-    caregivers = db.query(Caregiver).all()
-    current_date = datetime.now().date()
-    current_time = datetime.now().time()
-
-    for caregiver in caregivers:
-        for booking in caregiver.bookings:  # Assuming Caregiver has `bookings` relationship
-            try:
-                # ✅ Handle cases where booking.date includes time
-                if " " in booking.date:  
-                    booking_date = datetime.strptime(booking.date.split(" ")[0], "%Y-%m-%d").date()
-                else:
-                    booking_date = datetime.strptime(booking.date, "%Y-%m-%d").date()
-
-                # ✅ Handle 12-hour format (AM/PM)
-                booking_time_to = datetime.strptime(booking.time_to, "%I:%M %p").time()
-
-            except ValueError:
-                print(f"Invalid date/time format in booking: {booking.date} {booking.time_to}")
-                continue  # Skip this booking if format is wrong
-
-            # ✅ Compare correctly
-            if booking_date < current_date or (booking_date == current_date and booking_time_to <= current_time):
-                booking.status = "expired"
-
+MAX_BOOKING_LENGTH = timedelta(days=1)
+
+def parse_booking_window(date: str, time_from: str, time_to: str):
+    """Parses a booking's free-form date and times into (starts_at, ends_at), or None if malformed."""
+    try:
+        # ✅ Handle cases where booking.date includes time
+        booking_date = datetime.strptime(date.split(" ")[0], "%Y-%m-%d").date()
+        # ✅ Handle 12-hour format (AM/PM)
+        booking_time_from = datetime.strptime(time_from, "%I:%M %p").time()
+        booking_time_to = datetime.strptime(time_to, "%I:%M %p").time()
+    except ValueError:
+        return None
+    return datetime.combine(booking_date, booking_time_from), datetime.combine(booking_date, booking_time_to)
+
+
+BACKFILL_SWEEP = "booking_window_backfill"
+
+def backfill_booking_times(db: Session, batch_size: int = 500):
+    """Fills starts_at/ends_at for legacy string-only bookings in small committed batches.
+
+    Returns (backfilled, skipped). Rows whose date/time can't be parsed are logged once and
+    left behind the pass's id cursor, so later sweeps don't re-parse them.
+    """
+    state = db.get(SweepState, BACKFILL_SWEEP)
+    if state is None:
+        state = SweepState(name=BACKFILL_SWEEP, last_id=0)
+        db.add(state)
+    backfilled = skipped = 0
+    while True:
+        legacy = db.query(Booking.id, Booking.date, Booking.time_from, Booking.time_to).filter(
+            Booking.id > (state.last_id or 0),
+            or_(Booking.starts_at.is_(None), Booking.ends_at.is_(None)),
+        ).order_by(Booking.id).limit(batch_size).all()
+        if not legacy:
+            db.commit()
+            return backfilled, skipped
+
+        rows = []
+        for booking_id, date, time_from, time_to in legacy:
+            window = parse_booking_window(date, time_from, time_to)
+            if window is None:
+                logger.warning("Skipping booking %s with invalid date/time: %r %r %r", booking_id, date, time_from, time_to)
+                skipped += 1
+                continue
+            rows.append({"id": booking_id, "starts_at": window[0], "ends_at": window[1]})
+        if rows:
+            db.execute(update(Booking), rows)
+        state.last_id = legacy[-1].id
+        # ✅ Commit per batch so the write lock is released between batches
+        db.commit()
+        backfilled += len(rows)
+
+
+EXPIRY_SWEEP = "booking_expiry"
+
+def _expire_where(db: Session, condition):
+    """Flips matching bookings to inactive in one UPDATE and frees their slots (caller commits).
+
+    Returns the expired rows, which callers publish to the booking event hub after commit.
+    """
+    expired = db.execute(
+        update(Booking).where(condition).values(is_active=False)
+        .returning(Booking.id, Booking.pet_id, Booking.caregiver_id, Booking.starts_at,
+                   Booking.date, Booking.time_from, Booking.time_to, Booking.is_active)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # ✅ Free the slots of bookings that just ended
+    for caregiver_id, day in {(row.caregiver_id, row.starts_at.date()) for row in expired if row.starts_at}:
+        rebuild_day_slots(db, caregiver_id, day)
+    return expired
+
+def expire_bookings(db: Session, booking_ids):
+    """Expires exactly the given bookings if they are still active and have ended."""
+    expired = _expire_where(db, and_(
+        Booking.id.in_(booking_ids), Booking.is_active == True, Booking.ends_at <= datetime.now()
+    ))
     db.commit()
+    booking_events.publish(booking_change_events(db, "expired", expired))
+    return len(expired)
+
+def update_expired_availability(db: Session):
+    """Expires bookings that ended since the last sweep with a single bulk UPDATE."""
+    started = time.perf_counter()
+    now = datetime.now()
+
+    backfilled, skipped = backfill_booking_times(db)
+
+    state = db.get(SweepState, EXPIRY_SWEEP)
+    if state is None:
+        state = SweepState(name=EXPIRY_SWEEP, watermark=None)
+        db.add(state)
+
+    due = and_(Booking.is_active == True, Booking.ends_at <= now)
+    if state.watermark is not None and not backfilled:
+        # ✅ Everything at or before the watermark was flipped by an earlier sweep
+        due = and_(due, Booking.ends_at > state.watermark)
+
+    expired = _expire_where(db, due)
+    # ✅ Advance only to the latest end time this transaction saw as expired. A booking
+    # committed after the UPDATE with an earlier end than `now` stays above the watermark.
+    processed = db.scalar(select(func.max(Booking.ends_at)).where(Booking.ends_at <= now, Booking.is_active == False))
+    if processed is not None and (state.watermark is None or processed > state.watermark):
+        state.watermark = processed
+    db.commit()
+    booking_events.publish(booking_change_events(db, "expired", expired))
+
+    return {
+        "expired": len(expired),
+        "backfilled": backfilled,
+        "skipped": skipped,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
 
 
 # def create_review(db: Session, owner_id: int, review_data: ReviewCreate):
@@ -174,14 +478,65 @@ def create_review(db: Session, review_data: ReviewCreate, owner_id: int):
     )
 
     db.add(new_review)
+    db.flush()  # ✅ Assigns the id the search index is keyed by
+    index_reviews(db, [{"id": new_review.id, "comment": new_review.comment}])
+    _add_to_rating_summary(db, review_data.caregiver_id, review_data.rating)
     db.commit()
-    db.refresh(new_review)
+    on_commit(db, invalidate_responses, f"reviews:{review_data.caregiver_id}")
     return new_review
 
 def get_reviews_by_caregiver(db: Session, caregiver_id: int):
     """Fetch all reviews for a given caregiver."""
     return db.query(Review).filter(Review.caregiver_id == caregiver_id).all()
 
+# 🔹 Rating Summaries
+def _add_to_rating_summary(db: Session, caregiver_id: int, rating: int):
+    """Folds one rating into the caregiver's summary inside the caller's transaction."""
+    if db.get(CaregiverRating, caregiver_id) is None:
+        db.add(CaregiverRating(caregiver_id=caregiver_id))
+        db.flush()
+    # ✅ Increment in SQL so concurrent reviews don't overwrite each other
+    stars = getattr(CaregiverRating, f"stars_{rating}")
+    db.execute(
+        update(CaregiverRating).where(CaregiverRating.caregiver_id == caregiver_id).values({
+            CaregiverRating.review_count: CaregiverRating.review_count + 1,
+            CaregiverRating.rating_sum: CaregiverRating.rating_sum + rating,
+            CaregiverRating.rating_mean: (CaregiverRating.rating_sum + rating) * 1.0 / (CaregiverRating.review_count + 1),
+            stars: stars + 1,
+        }).execution_options(synchronize_session=False)
+    )
+
+def ensure_rating_summaries(db: Session):
+    """Builds caregiver_ratings from existing reviews once, when the table is still empty."""
+    if db.query(CaregiverRating.caregiver_id).first() is not None:
+        return 0
+    star_counts = [func.sum(case((Review.rating == n, 1), else_=0)) for n in range(1, 6)]
+    rows = [
+        {
+            "caregiver_id": caregiver_id, "review_count": count, "rating_sum": total,
+            "rating_mean": total / count, **{f"stars_{n}": stars[n - 1] for n in range(1, 6)},
+        }
+        for caregiver_id, count, total, *stars in db.query(
+            Review.caregiver_id, func.count(Review.id), func.sum(Review.rating), *star_counts
+        ).group_by(Review.caregiver_id).all()
+    ]
+    if rows:
+        db.execute(insert(CaregiverRating), rows)
+    db.commit()
+    return len(rows)
+
+def get_rating_summary(db: Session, caregiver_id: int):
+    return db.get(CaregiverRating, caregiver_id)
+
+def get_leaderboard(db: Session, limit: int = 10, pet_type: Optional[str] = None):
+    """Top-rated caregivers, read in index order from caregiver_ratings."""
+    query = db.query(
+        CaregiverRating.caregiver_id, Caregiver.username, CaregiverRating.review_count, CaregiverRating.rating_mean
+    ).join(Caregiver, Caregiver.id == CaregiverRating.caregiver_id)
+    if pet_type is not None:
+        query = query.filter(_pet_type_filter(pet_type))
+    return query.order_by(CaregiverRating.rating_mean.desc(), CaregiverRating.review_count.desc()).limit(limit).all()
+
 def create_health_record(db: Session, pet_id: int, health_data: HealthRecordCreate):
     db_health_record = HealthRecord(
         pet_id=pet_id,
@@ -197,10 +552,193 @@ def create_health_record(db: Session, pet_id: int, health_data: HealthRecordCrea
         last_checkup_date=health_data.last_checkup_date
     )
     db.add(db_health_record)
+    db.flush()
+    index_health_records(db, [{"id": db_health_record.id, **health_data.model_dump()}])
     db.commit()
-    db.refresh(db_health_record)
+    on_commit(db, invalidate_due_report)
     return db_health_record
 
+# 🔹 Vaccination and Checkup Due Report
+VACCINATION_INTERVAL = timedelta(days=365)
+CHECKUP_INTERVAL = timedelta(days=365)
+
+# Report pages for the current day; keyed by a generation that health-record writes bump.
+# The generation is per process, so with several workers entries also expire
+# DUE_REPORT_CACHE_TTL seconds after they were stored.
+DUE_REPORT_CACHE_TTL = float(os.getenv("PETCARE_DUE_REPORT_CACHE_TTL", "30"))
+due_report_cache = LRUCache(maxsize=1024)
+_due_report_generation = 0
+_due_report_lock = threading.Lock()
+
+def invalidate_due_report():
+    global _due_report_generation
+    with _due_report_lock:
+        _due_report_generation += 1
+    due_report_cache.clear()
+
+def get_due_report(db: Session, within_days: int = 30, kind: str = "any", pet_type: Optional[str] = None,
+                   vet_name: Optional[str] = None, include_missing: bool = False,
+                   after_id: Optional[int] = None, limit: Optional[int] = None):
+    """Pets whose vaccination and/or checkup falls due within `within_days` (or is already overdue)."""
+    today = date.today()
+    with _due_report_lock:
+        generation = _due_report_generation
+    key = (generation, today, within_days, kind, pet_type, vet_name, include_missing, after_id, limit)
+    cached = due_report_cache.get(key)
+    if cached is not None:
+        return cached
+
+    horizon = today + timedelta(days=within_days)
+    # ✅ "due by horizon" is rewritten as a range on the indexed last-* date columns
+    conditions = []
+    if kind in ("vaccination", "any"):
+        due = HealthRecord.last_vaccination_date <= horizon - VACCINATION_INTERVAL
+        conditions.append(or_(due, HealthRecord.last_vaccination_date.is_(None)) if include_missing else due)
+    if kind in ("checkup", "any"):
+        due = HealthRecord.last_checkup_date <= horizon - CHECKUP_INTERVAL
+        conditions.append(or_(due, HealthRecord.last_checkup_date.is_(None)) if include_missing else due)
+
+    query = db.query(
+        HealthRecord.id, HealthRecord.pet_id, Pet.name.label("pet_name"), Pet.pet_type, Pet.owner_id,
+        HealthRecord.vet_name, HealthRecord.vet_contact,
+        HealthRecord.last_vaccination_date,
+        func.date(HealthRecord.last_vaccination_date, f"+{VACCINATION_INTERVAL.days} days").label("vaccination_due"),
+        HealthRecord.last_checkup_date,
+        func.date(HealthRecord.last_checkup_date, f"+{CHECKUP_INTERVAL.days} days").label("checkup_due"),
+    ).join(Pet, Pet.id == HealthRecord.pet_id).filter(or_(*conditions))
+    if pet_type is not None:
+        query = query.filter(Pet.pet_type == pet_type)
+    if vet_name is not None:
+        query = query.filter(HealthRecord.vet_name == vet_name)
+
+    rows = _keyset_page(query, HealthRecord, after_id, limit)
+    end_of_day = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    due_report_cache.set(key, rows, expires_at=min(end_of_day, time.time() + DUE_REPORT_CACHE_TTL))
+    return rows
+
+# 🔹 Bulk Ingestion
+MAX_BULK_ITEMS = 5000
+
+def _insert_many(db: Session, model, rows):
+    """executemany INSERT returning generated IDs in parameter order."""
+    if not rows:
+        return []
+    return list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows))
+
+def _bulk_result(ids, errors):
+    return {"created": ids, "errors": [{"index": i, "detail": detail} for i, detail in sorted(errors.items())]}
+
+def bulk_create_pets(db: Session, pets):
+    """Inserts pets for many owners in one transaction, reporting rows with unknown owners."""
+    owner_ids = {pet.owner_id for pet in pets}
+    known_owners = set(db.scalars(select(User.id).where(User.id.in_(owner_ids))))
+
+    errors, rows = {}, []
+    for i, pet in enumerate(pets):
+        if pet.owner_id not in known_owners:
+            errors[i] = "User not found"
+            continue
+        rows.append({"name": pet.name, "pet_type": pet.pet_type, "owner_id": pet.owner_id})
+
+    ids = _insert_many(db, Pet, rows)
+    db.commit()
+    invalidate_responses("pets")
+    return _bulk_result(ids, errors)
+
+def bulk_create_bookings(db: Session, bookings):
+    """Validates and inserts bookings in one transaction; conflicts are checked against the DB and the batch."""
+    caregiver_ids = {b.caregiver_id for b in bookings}
+    active_caregivers = set(db.scalars(
+        select(Caregiver.id).where(Caregiver.id.in_(caregiver_ids), Caregiver.is_active == True)
+    ))
+    pet_types = dict(db.execute(
+        select(Pet.id, Pet.pet_type).where(Pet.id.in_({b.pet_id for b in bookings}))
+    ).all())
+    accepted_types = set(db.execute(
+        select(CaregiverPetType.caregiver_id, CaregiverPetType.pet_type).where(CaregiverPetType.caregiver_id.in_(caregiver_ids))
+    ).all())
+
+    errors, windows = {}, {}
+    for i, b in enumerate(bookings):
+        window = parse_booking_window(b.date, b.time_from, b.time_to)
+        if b.caregiver_id not in active_caregivers:
+            errors[i] = "Caregiver not found or no longer available"
+        elif b.pet_id not in pet_types:
+            errors[i] = "Pet not found"
+        elif (b.caregiver_id, pet_types[b.pet_id]) not in accepted_types:
+            errors[i] = f"Caregiver does not take care of {pet_types[b.pet_id]}"
+        elif window is None:
+            errors[i] = "Invalid date/time format, expected YYYY-MM-DD and HH:MM AM/PM"
+        elif window[1] <= window[0]:
+            errors[i] = "Booking must end after it starts"
+        else:
+            windows[i] = window
+
+    # ✅ One range query loads every existing booking that could collide with the batch
+    taken = {}
+    if windows:
+        earliest = min(start for start, _ in windows.values())
+        latest = max(end for _, end in windows.values())
+        for caregiver_id, starts_at, ends_at in db.execute(
+            select(Booking.caregiver_id, Booking.starts_at, Booking.ends_at).where(
+                Booking.caregiver_id.in_({bookings[i].caregiver_id for i in windows}),
+                Booking.starts_at > earliest - MAX_BOOKING_LENGTH,
+                Booking.starts_at < latest,
+                Booking.ends_at > earliest,
+                Booking.is_active == True,
+            )
+        ):
+            taken.setdefault(caregiver_id, []).append((starts_at, ends_at))
+
+    now = datetime.now()
+    rows, slots = [], []
+    for i, (starts_at, ends_at) in windows.items():
+        b = bookings[i]
+        if any(s < ends_at and e > starts_at for s, e in taken.get(b.caregiver_id, [])):
+            errors[i] = "Caregiver is already booked for this time slot"
+            continue
+        is_active = ends_at > now
+        if is_active:
+            taken.setdefault(b.caregiver_id, []).append((starts_at, ends_at))
+            slots.append((b.caregiver_id, starts_at, ends_at))
+        rows.append({
+            "pet_id": b.pet_id, "caregiver_id": b.caregiver_id, "date": b.date, "time_from": b.time_from,
+            "time_to": b.time_to, "starts_at": starts_at, "ends_at": ends_at, "is_active": is_active,
+        })
+
+    ids = _insert_many(db, Booking, rows)
+    mark_slots_bulk(db, slots)
+    db.commit()
+    for booking_id, row in zip(ids, rows):
+        if row["is_active"]:
+            expiry_scheduler.schedule(booking_id, row["ends_at"])
+    if booking_events.has_subscribers():
+        created = [Booking(id=booking_id, **row) for booking_id, row in zip(ids, rows)]
+        booking_events.publish(booking_change_events(db, "created", created))
+    return _bulk_result(ids, errors)
+
+def bulk_create_health_records(db: Session, records):
+    """Inserts health records in one transaction; each pet may have only one record."""
+    pet_ids = {r.pet_id for r in records}
+    known_pets = set(db.scalars(select(Pet.id).where(Pet.id.in_(pet_ids))))
+    has_record = set(db.scalars(select(HealthRecord.pet_id).where(HealthRecord.pet_id.in_(pet_ids))))
+
+    errors, rows = {}, []
+    for i, record in enumerate(records):
+        if record.pet_id not in known_pets:
+            errors[i] = "Pet not found"
+        elif record.pet_id in has_record:
+            errors[i] = "Pet already has a health record"
+        else:
+            has_record.add(record.pet_id)
+            rows.append(record.model_dump())
+
+    ids = _insert_many(db, HealthRecord, rows)
+    index_health_records(db, [{"id": record_id, **row} for record_id, row in zip(ids, rows)])
+    db.commit()
+    invalidate_due_report()
+    return _bulk_result(ids, errors)
+
 # def delete_user(db: Session, user_id: int):
 #     """Deletes a user and their related data from the database."""
 #     user = db.query(User).filter(User.id == user_id).first()
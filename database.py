@@ -1,24 +1,161 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from datetime import datetime
+from leader import exclusive_file_lock
+import hashlib
+import json
+import os
 
-DATABASE_URL = "sqlite:///./petcare.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_PATH = "./petcare.db"
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 🔹 Engine profile: "default" keeps SQLite's stock settings, "production" turns on WAL,
+# tuned pragmas, one dedicated writer connection and a pool of read-only connections.
+DB_PROFILE = os.getenv("PETCARE_DB_PROFILE", "default")
+READ_POOL_SIZE = int(os.getenv("PETCARE_DB_READ_POOL_SIZE", "8"))
+
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Safe with WAL; fsyncs at checkpoints instead of every commit
+    "busy_timeout": 5000,  # ms to wait on another process's lock before "database is locked"
+    "cache_size": -65536,  # 64 MiB page cache (negative = KiB)
+    "mmap_size": 268435456,  # 256 MiB memory-mapped I/O
+    "temp_store": "MEMORY",
+}
+
+def _apply_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+if DB_PROFILE == "production":
+    # ✅ Exactly one writer connection: in-process writers queue on the pool instead of the file lock
+    engine = create_engine(
+        DATABASE_URL, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0, pool_timeout=30
+    )
+    _apply_pragmas(engine, PRODUCTION_PRAGMAS)
+    read_engine = create_engine(
+        f"sqlite:///file:{DATABASE_PATH}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    # The writer already switched the file to WAL; read-only connections can't change journal mode
+    read_pragmas = {name: value for name, value in PRODUCTION_PRAGMAS.items() if name != "journal_mode"}
+    _apply_pragmas(read_engine, {**read_pragmas, "query_only": 1})
+else:
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    read_engine = engine
+
+# ✅ Written rows keep their attributes after commit, so writes return them without a refresh SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
-def initialize_database():
-    """Drops and recreates all tables in the database to match the updated schema."""
-    import os
-    if os.path.exists("petcare.db"):
-        os.remove("petcare.db")  # Delete old database
-    Base.metadata.create_all(bind=engine)
+# 🔹 Async mode: set PETCARE_ASYNC_DB=1 to serve requests through an AsyncSession (needs aiosqlite)
+ASYNC_DB = os.getenv("PETCARE_ASYNC_DB", "0") == "1"
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    if DB_PROFILE == "production":
+        _apply_pragmas(async_engine.sync_engine, PRODUCTION_PRAGMAS)
+    # ✅ Keep attributes loaded after commit; lazy refreshes can't run outside the greenlet
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 🔹 Schema Fingerprint
+# A hash of the models (tables, column types, constraints, indexes) plus SCHEMA_VERSION is
+# stored in schema_state after each migration. Startup compares it with the models' hash and
+# skips create_all(), upgrade_schema() and the backfills when nothing changed.
+SCHEMA_VERSION = 1  # ✅ Bump to rerun the startup migration (e.g. for a new backfill) without a model change
+
+def schema_fingerprint(metadata=None) -> str:
+    """Hash of everything create_all() and upgrade_schema() would act on."""
+    metadata = metadata if metadata is not None else Base.metadata
+    tables = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        columns = [
+            (c.name, str(c.type.compile(dialect=engine.dialect)), c.primary_key, c.nullable, bool(c.unique),
+             sorted(fk.target_fullname for fk in c.foreign_keys))
+            for c in table.columns
+        ]
+        indexes = sorted((i.name, [c.name for c in i.columns], bool(i.unique)) for i in table.indexes)
+        tables.append((table.name, columns, indexes))
+    digest = hashlib.sha256(json.dumps([SCHEMA_VERSION, tables]).encode()).hexdigest()
+    return f"{SCHEMA_VERSION}:{digest}"
+
+def stored_schema_fingerprint(bind=engine):
+    """The fingerprint recorded by the last migration, or None for a new or pre-fingerprint database."""
+    with bind.connect() as conn:
+        try:
+            return conn.execute(text("SELECT fingerprint FROM schema_state WHERE id = 1")).scalar()
+        except OperationalError:
+            return None  # No schema_state table yet
+
+def _store_schema_fingerprint(bind, fingerprint: str):
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_state "
+            "(id INTEGER PRIMARY KEY, version INTEGER NOT NULL, fingerprint TEXT NOT NULL, migrated_at TEXT NOT NULL)"
+        ))
+        conn.execute(
+            text("INSERT OR REPLACE INTO schema_state (id, version, fingerprint, migrated_at) VALUES (1, :v, :f, :at)"),
+            {"v": SCHEMA_VERSION, "f": fingerprint, "at": datetime.now().isoformat(timespec="seconds")},
+        )
+
+def initialize_database(backfill=None, bind=engine) -> bool:
+    """Creates and upgrades the schema, then runs `backfill()`, only if the models changed since the
+    last run; returns True if it migrated. Existing data is kept."""
+    fingerprint = schema_fingerprint()
+    if stored_schema_fingerprint(bind) == fingerprint:
+        return False
+    # ✅ Workers starting together take turns, so one-time migrations run exactly once
+    with exclusive_file_lock(DATABASE_PATH + ".startup.lock"):
+        if stored_schema_fingerprint(bind) == fingerprint:
+            return False  # Another worker migrated while we waited
+        Base.metadata.create_all(bind=bind)
+        upgrade_schema(bind)
+        if backfill is not None:
+            backfill()
+        _store_schema_fingerprint(bind, fingerprint)
+    return True
+
+def upgrade_schema(bind=engine):
+    """Adds columns and indexes that create_all() skips on tables that already exist."""
+    with bind.begin() as conn:
+        inspector = inspect(conn)  # ✅ Reuse the connection; the production writer pool holds only one
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
     
 # Database Dependency
-def get_db():
-    db = SessionLocal()
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def get_db(request: Request):
+    """Read-only requests get a session on the read pool; everything else gets the writer."""
+    db = ReadSessionLocal() if request.method in READ_METHODS else SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async Database Dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Pet
+
+# 🔹 Booking Event Hub
+# In-process pub/sub: write paths publish booking changes after commit, SSE subscribers
+# receive the ones for their topics ("owner:<id>", "caregiver:<id>"). Each subscriber has
+# its own bounded queue, so a slow client only ever overflows itself.
+# The hub is per process: a subscriber only sees changes made by its own worker, and
+# expiries only reach subscribers of the background-job leader. Serve /bookings/stream
+# from a single worker (or route it to one) when running with --workers N.
+EVENT_QUEUE_SIZE = int(os.getenv("PETCARE_EVENT_QUEUE_SIZE", "100"))
+
+
+class Subscription:
+    """One SSE client: a bounded queue living on the event loop that serves it."""
+
+    def __init__(self, hub, topics, maxsize: int):
+        self.hub = hub
+        self.topics = topics
+        self.maxsize = maxsize
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()  # Bounded by offer(), which holds at most maxsize events
+        self.overflowed = False
+
+    def offer(self, event):
+        """Runs on the subscriber's loop; a full queue marks it overflowed instead of blocking."""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.maxsize:
+            self.overflowed = True
+            self.hub.overflows += 1
+            event = None  # Wakes the stream so it can tell the client to resync
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    def __init__(self, maxsize: int = EVENT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._topics = {}  # topic -> set of Subscriptions
+        self._lock = threading.Lock()
+        self.published = 0
+        self.overflows = 0  # Subscribers cut off for falling behind
+
+    def subscribe(self, *topics):
+        """Registers a subscription on the running event loop; pair with unsubscribe()."""
+        subscription = Subscription(self, topics, self.maxsize)
+        with self._lock:
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def has_subscribers(self):
+        return bool(self._topics)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+    def publish(self, events):
+        """Thread-safe; fans (topics, payload) pairs out to subscribers without waiting on any of them."""
+        for topics, payload in events:
+            with self._lock:
+                targets = {s for topic in topics for s in self._topics.get(topic, ())}
+            for subscription in targets:
+                if subscription.overflowed:
+                    continue
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, payload)
+                except RuntimeError:
+                    self.unsubscribe(subscription)  # Its event loop has shut down
+            self.published += 1
+
+booking_events = EventHub()
+
+
+def _booking_payloads(kind: str, bookings, owners):
+    return [
+        (
+            (f"owner:{owners.get(b.pet_id)}", f"caregiver:{b.caregiver_id}"),
+            {
+                "type": kind,
+                "booking": {
+                    "id": b.id, "pet_id": b.pet_id, "caregiver_id": b.caregiver_id, "date": b.date,
+                    "time_from": b.time_from, "time_to": b.time_to, "is_active": b.is_active,
+                },
+            },
+        )
+        for b in bookings
+    ]
+
+def booking_change_events(db: Session, kind: str, bookings):
+    """Builds (topics, payload) pairs for changed bookings; looks up pet owners only if anyone listens."""
+    if not bookings or not booking_events.has_subscribers():
+        return []
+    owners = dict(db.execute(select(Pet.id, Pet.owner_id).where(Pet.id.in_({b.pet_id for b in bookings}))).all())
+    return _booking_payloads(kind, bookings, owners)
+
+def publish_booking_changes(kind: str, bookings, owners):
+    """on_commit callback: builds the events only once the write is durable, and only if anyone listens.
+
+    `owners` maps pet_id -> owner_id, since under group commit the writing session is gone by then.
+    """
+    if booking_events.has_subscribers():
+        booking_events.publish(_booking_payloads(kind, bookings, owners))
+
+
+# 🔹 Server-Sent Events
+KEEPALIVE_SECONDS = 15
+
+async def sse_stream(subscription, is_disconnected):
+    """Yields SSE frames for a subscription until the client leaves or falls too far behind."""
+    try:
+        yield b": connected\n\n"
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if subscription.overflowed:
+                # ✅ The client missed events; it should refetch /bookings/ and reconnect
+                yield b"event: resync\ndata: {}\n\n"
+                return
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+    finally:
+        subscription.hub.unsubscribe(subscription)
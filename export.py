@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from database import ReadSessionLocal
+from models import Booking, Pet, Review
+from schemas import BookingResponse, PetResponse, ReviewResponse
+
+# Table name -> (model, schema whose fields are exported)
+EXPORTS = {
+    "bookings": (Booking, BookingResponse),
+    "pets": (Pet, PetResponse),
+    "reviews": (Review, ReviewResponse),
+}
+BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# 🔹 Row Encoders
+def _ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+def _csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # Header only, for an empty table
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# 🔹 Export Stream
+def stream_export(table: str, fmt: str, compress: bool = False):
+    """Yields a table as NDJSON or CSV bytes, reading BATCH_SIZE rows at a time from a server-side cursor."""
+    model, schema = EXPORTS[table]
+    columns = list(schema.model_fields)
+    encode = _ndjson_chunks if fmt == "ndjson" else _csv_chunks
+
+    def chunks():
+        # ✅ Own session: the request's session may be closed before streaming finishes
+        db = ReadSessionLocal()
+        try:
+            result = db.execute(
+                select(*[getattr(model, c) for c in columns]).order_by(model.id).execution_options(yield_per=BATCH_SIZE)
+            )
+            for text in encode(columns, result.partitions()):
+                yield text.encode()
+        finally:
+            db.close()
+
+    return _gzip(chunks()) if compress else chunks()
@@ -0,0 +1,38 @@
+import os
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+# 🔹 Fast List Serialization
+# Set PETCARE_FAST_SERIALIZATION=1 to have list endpoints select plain column tuples and
+# encode them with a serializer compiled once per response schema, instead of loading ORM
+# objects and validating each one through the response model. Only for trusted DB output:
+# rows are encoded as-is, never validated. The declared response_model (and so the
+# OpenAPI schema) is unchanged.
+FAST_SERIALIZATION = os.getenv("PETCARE_FAST_SERIALIZATION", "0") == "1"
+
+_serializers = {}
+
+def row_serializer(schema):
+    """Compiled JSON serializer for a list of dicts shaped like (a subset of) `schema`."""
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        fields = {name: field.annotation for name, field in schema.model_fields.items()}
+        # total=False: projected rows carry only the requested keys; unknown keys are dropped
+        row_type = TypedDict(f"{schema.__name__}Row", fields, total=False)
+        serializer = _serializers[schema] = TypeAdapter(list[row_type])
+    return serializer
+
+def list_fields(projection, schema):
+    """The columns a list endpoint should select: the `fields=` projection, or every field in fast mode."""
+    if projection is None and FAST_SERIALIZATION:
+        return list(schema.model_fields)
+    return projection
+
+def dump_rows(schema, rows, fields) -> bytes:
+    """Encodes column rows to JSON bytes, keeping only `fields` in that order."""
+    if not rows:
+        return b"[]"
+    positions = [rows[0]._fields.index(f) for f in fields]
+    return row_serializer(schema).dump_json(
+        [{f: row[i] for f, i in zip(fields, positions)} for row in rows], warnings=False
+    )
@@ -0,0 +1,132 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("petcare.group_commit")
+
+# 🔹 Group Commit: set PETCARE_GROUP_COMMIT=1 to funnel single-row writes through one writer
+# thread that runs up to GROUP_COMMIT_MAX_OPS of them in a single transaction, each inside
+# its own SAVEPOINT, and commits (one fsync) once per batch.
+GROUP_COMMIT = os.getenv("PETCARE_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW = float(os.getenv("PETCARE_GROUP_COMMIT_WINDOW_MS", "2")) / 1000
+GROUP_COMMIT_MAX_OPS = int(os.getenv("PETCARE_GROUP_COMMIT_MAX_OPS", "64"))
+
+
+class GroupSession(Session):
+    """Session for one batch: commit() from crud code only flushes; the committer commits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.after_commit_callbacks = []
+
+    def commit(self):
+        self.flush()
+
+    def commit_batch(self):
+        super().commit()
+
+
+def on_commit(db: Session, callback, *args):
+    """Runs `callback(*args)` once the caller's writes are durable (after the batch commit under group commit)."""
+    if isinstance(db, GroupSession):
+        db.after_commit_callbacks.append((callback, args))
+    else:
+        callback(*args)
+
+
+class GroupCommitter:
+    """Single writer thread coalescing concurrent write operations into shared transactions."""
+
+    def __init__(self, window: float = GROUP_COMMIT_WINDOW, max_ops: int = GROUP_COMMIT_MAX_OPS):
+        self.window = window
+        self.max_ops = max_ops
+        self._queue = queue.SimpleQueue()
+        self._bind = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.ops = 0
+
+    def submit(self, bind, fn, *args) -> Future:
+        """Queues `fn(db, *args)`; the future resolves with its result after the batch commits."""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._bind = bind
+                    self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                    self._thread.start()
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def stats(self):
+        return {"batches": self.batches, "ops": self.ops}
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_ops:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            except Exception as exc:  # The commit itself failed: every op in the batch fails with it
+                logger.exception("Group commit of %d operations failed", len(batch))
+                for future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _run_batch(self, batch):
+        results, callbacks = [], []
+        with GroupSession(bind=self._bind, autoflush=False, expire_on_commit=False) as db:
+            # ✅ Explicit BEGIN so pysqlite doesn't let the first SAVEPOINT open (and RELEASE commit) the transaction
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for future, fn, args in batch:
+                db.after_commit_callbacks = []
+                savepoint = db.begin_nested()
+                try:
+                    result = fn(db, *args)
+                    db.flush()
+                except BaseException as exc:
+                    savepoint.rollback()
+                    future.set_exception(exc)
+                    continue
+                savepoint.commit()
+                results.append((future, result))
+                callbacks += db.after_commit_callbacks
+            db.commit_batch()
+        self.batches += 1
+        self.ops += len(batch)
+        for callback, args in callbacks:
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("After-commit callback failed")
+        for future, result in results:
+            future.set_result(result)
+
+group_committer = GroupCommitter()
+
+def run_write(db: Session, fn, *args):
+    """Runs the crud write `fn(db, *args)` directly, or batched with other requests under group commit."""
+    if not GROUP_COMMIT:
+        return fn(db, *args)
+    bind = db.get_bind()
+    # ✅ Release the request's connection first: under the production profile it is the only
+    # writer connection, and the batch would wait on it forever
+    db.close()
+    return group_committer.submit(bind, fn, *args).result()
@@ -0,0 +1,135 @@
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process is its own leader
+    fcntl = None
+
+logger = logging.getLogger("petcare.leader")
+
+# 🔹 Leader Election
+# Under `uvicorn --workers N` every worker imports main.py; only the elected leader runs
+# background jobs. "file" uses an flock the OS releases the moment the leader dies;
+# "lease" renews a row in the leases table and suits setups where workers share the
+# database but not a filesystem; "off" runs jobs in every process.
+LEADER_ELECTION = os.getenv("PETCARE_LEADER_ELECTION", "file")
+LEASE_TTL = float(os.getenv("PETCARE_LEASE_TTL", "10"))
+LEASE_RENEW_INTERVAL = LEASE_TTL / 3
+
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+@contextlib.contextmanager
+def exclusive_file_lock(path: str):
+    """Holds an exclusive flock on `path` for the duration of the block (blocks until free)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+JOB_RETRY_DELAY = 5.0  # Seconds before a leader whose jobs crashed stands for election again
+
+def _run_job(job, stop) -> bool:
+    """Runs one leadership term of `job`; a crash is logged and reported instead of ending the thread."""
+    try:
+        job(stop)
+        return True
+    except Exception:
+        logger.exception("Background jobs failed; retrying in %ss", JOB_RETRY_DELAY)
+        return False
+
+def _run_with_file_lock(path, job):
+    while True:
+        # ✅ Blocks standbys in flock; the kernel hands the lock over as soon as the leader exits
+        with exclusive_file_lock(path):
+            logger.info("%s elected leader via %s", HOLDER_ID, path)
+            if _run_job(job, threading.Event()):
+                return
+        time.sleep(JOB_RETRY_DELAY)  # Lock released meanwhile, so a standby can take over
+
+def try_acquire_lease(db, name: str) -> bool:
+    """Takes or renews the named lease if it is free, expired or already ours."""
+    from sqlalchemy import update
+    from sqlalchemy.exc import IntegrityError
+    from models import Lease
+
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=LEASE_TTL)
+    result = db.execute(
+        update(Lease)
+        .where(Lease.name == name, (Lease.holder == HOLDER_ID) | (Lease.expires_at < now))
+        .values(holder=HOLDER_ID, expires_at=expires_at)
+    )
+    if result.rowcount == 0:
+        if db.get(Lease, name) is not None:
+            db.rollback()
+            return False
+        db.add(Lease(name=name, holder=HOLDER_ID, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another worker inserted it first
+            return False
+        return True
+    db.commit()
+    return True
+
+def _run_with_lease(session_factory, name, job, wake):
+    while True:
+        try:
+            with session_factory() as db:
+                acquired = try_acquire_lease(db, name)
+        except Exception:
+            logger.exception("Lease acquisition failed")
+            acquired = False
+        if not acquired:
+            time.sleep(LEASE_RENEW_INTERVAL)
+            continue
+
+        logger.info("%s elected leader via lease %r", HOLDER_ID, name)
+        lost = threading.Event()  # ✅ One per term: a stop from an earlier term cannot leak into this one
+
+        def renew():
+            while not lost.wait(LEASE_RENEW_INTERVAL):
+                try:
+                    with session_factory() as db:
+                        still_leader = try_acquire_lease(db, name)
+                except Exception:
+                    logger.exception("Lease renewal failed")
+                    still_leader = False
+                if not still_leader:
+                    logger.warning("%s lost lease %r; stopping background jobs", HOLDER_ID, name)
+                    lost.set()
+                    wake()
+
+        threading.Thread(target=renew, daemon=True).start()
+        try:
+            finished = _run_job(job, lost)  # Returns once `lost` is set, or on a crash
+        finally:
+            lost.set()  # ✅ Stops renewing, so the lease lapses unless this worker runs the jobs again
+        if not finished:
+            time.sleep(JOB_RETRY_DELAY)
+
+def run_as_leader(job, wake, session_factory, lock_path: str, name: str = "background_jobs"):
+    """Blocks until this process is leader, then runs `job(stop)`.
+
+    `stop` is a threading.Event set when leadership is lost; `wake` is called right after so
+    a sleeping job notices, and `job` must then return.
+    """
+    if LEADER_ELECTION == "off":
+        while not _run_job(job, threading.Event()):
+            time.sleep(JOB_RETRY_DELAY)
+    elif LEADER_ELECTION == "lease":
+        _run_with_lease(session_factory, name, job, wake)
+    else:
+        _run_with_file_lock(lock_path, job)
@@ -1,33 +1,129 @@
+import time
+IMPORT_STARTED = time.perf_counter()  # ✅ Before the other imports, so the breakdown includes them
+
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from router import router
-from database import engine, Base, SessionLocal  # ✅ Import Base here
+from database import engine, read_engine, async_engine, SessionLocal, initialize_database, ASYNC_DB, DATABASE_PATH
 import threading
-import time
-from crud import update_expired_availability
+from crud import update_expired_availability, ensure_pet_type_index, ensure_rating_summaries
+from availability import ensure_slot_bitmaps
+from search import ensure_search_index
+from scheduler import expiry_scheduler
+from metrics import MetricsMiddleware, instrument_engine, render_metrics
+from response_cache import ResponseCacheMiddleware, response_cache
+from auth import principal_cache, shutdown_hash_pool
+from crud import user_cache
+from leader import run_as_leader
+from group_commit import group_committer
+from events import booking_events
+from archive import archive_expired_bookings, ARCHIVE_INTERVAL
+
+logger = logging.getLogger("petcare.startup")
+
+# 🔹 Startup
+# Seconds spent in each startup phase of this process, exported by /metrics
+startup_timings = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    migrated = initialize_database(backfill_derived_tables)  # ✅ One SELECT when the models are unchanged
+    startup_timings["migrate" if migrated else "schema_check"] = time.perf_counter() - started
+    phase_started = time.perf_counter()
+    start_background_jobs()  # Only once the schema is in place
+    startup_timings["background_jobs"] = time.perf_counter() - phase_started
+    startup_timings["total"] = time.perf_counter() - IMPORT_STARTED
+    logger.info("Startup took %s", ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in startup_timings.items()))
+    yield
+    shutdown_hash_pool()
 
-app = FastAPI()
-# Ensure database schema is updated
-# Base.metadata.create_all(engine)
-Base.metadata.create_all(bind=engine)
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(MetricsMiddleware)  # ✅ Added last so it wraps the cache and also times cache hits
 
-def run_expiry_updates():
-    """Runs expired availability check every 5 minutes."""
-    while True:
-        db = SessionLocal()
-        update_expired_availability(db)
-        db.close()
-        time.sleep(300)
+# ✅ Count SQL per request on every engine that serves requests
+for db_engine in {engine, read_engine}:
+    instrument_engine(db_engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
 
-# Start background thread
-threading.Thread(target=run_expiry_updates, daemon=True).start()
+def backfill_derived_tables():
+    """Fills tables derived from existing rows; each step only does work when its table is empty."""
+    with SessionLocal() as db:
+        ensure_pet_type_index(db)
+        ensure_rating_summaries(db)
+        ensure_search_index(db)
+
+def _catch_up(step, stop):
+    """Runs one catch-up step in its own session, retrying failures until it succeeds or `stop` is set."""
+    while not stop.is_set():
+        try:
+            with SessionLocal() as db:
+                return step(db)
+        except Exception:
+            logger.exception("%s failed; retrying in %ss", step.__name__, expiry_scheduler.retry_delay)
+            stop.wait(expiry_scheduler.retry_delay)
+
+def run_expiry_updates(stop):
+    """Catches up on missed expiries, then expires each booking at its end time until `stop` is set."""
+    # ✅ Backfills booking times before the bitmaps are built
+    for step in (update_expired_availability, ensure_slot_bitmaps, archive_expired_bookings):
+        _catch_up(step, stop)
+    if not stop.is_set():  # Lost leadership mid catch-up
+        expiry_scheduler.run(SessionLocal, stop, periodic=[(ARCHIVE_INTERVAL, archive_expired_bookings)])
+
+def run_background_jobs():
+    """Runs in every worker; only the elected leader gets past the election."""
+    run_as_leader(run_expiry_updates, expiry_scheduler.wake, SessionLocal, DATABASE_PATH + ".leader.lock")
+
+_background_thread = None
+
+def start_background_jobs():
+    """Starts the leader-election thread once per process."""
+    global _background_thread
+    if _background_thread is None:
+        _background_thread = threading.Thread(target=run_background_jobs, name="background-jobs", daemon=True)
+        _background_thread.start()
 
 # Include all routes
+if ASYNC_DB:
+    from async_router import router as async_router
+    app.include_router(async_router)  # ✅ Registered first so its handlers take precedence
+    # The sync handlers they shadow are never reached; keep them out of the OpenAPI schema so
+    # every operation (and operation ID) is published once
+    shadowed = {(route.path, method) for route in async_router.routes for method in route.methods}
+    for route in router.routes:
+        if any((route.path, method) in shadowed for method in getattr(route, "methods", ())):
+            route.include_in_schema = False
 app.include_router(router)
+startup_timings["imports"] = time.perf_counter() - IMPORT_STARTED
 
 @app.get("/")
 def home():
     return {"message": "Welcome to the Pet Care API"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-route latency, SQL statement counts, DB time and rows in Prometheus text format."""
+    gauges, counters = {}, {}
+    for name, cache in (("principal", principal_cache), ("user", user_cache), ("response", response_cache)):
+        stats = cache.stats()
+        counters[f"petcare_{name}_cache_hits_total"] = stats["hits"]
+        counters[f"petcare_{name}_cache_misses_total"] = stats["misses"]
+        gauges[f"petcare_{name}_cache_size"] = stats["size"]
+    gauges["petcare_response_cache_bytes"] = response_cache.stats()["weight"]
+    counters["petcare_group_commit_batches_total"] = group_committer.batches
+    counters["petcare_group_commit_ops_total"] = group_committer.ops
+    gauges["petcare_booking_event_subscribers"] = booking_events.subscriber_count()
+    counters["petcare_booking_events_published_total"] = booking_events.published
+    counters["petcare_booking_event_overflows_total"] = booking_events.overflows
+    for phase, seconds in startup_timings.items():
+        gauges[f"petcare_startup_{phase}_seconds"] = seconds
+    return render_metrics(gauges, counters)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,183 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("petcare.metrics")
+
+# 🔹 Debug mode: log any request that issues more than PETCARE_QUERY_BUDGET SQL statements
+DEBUG_QUERIES = os.getenv("PETCARE_DEBUG_QUERIES", "0") == "1"
+QUERY_BUDGET = int(os.getenv("PETCARE_QUERY_BUDGET", "20"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """SQL activity attributed to the request currently being served."""
+
+    __slots__ = ("queries", "db_seconds", "rows", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0  # Rows returned by queries plus rows changed by INSERT/UPDATE/DELETE
+        self.statements = [] if DEBUG_QUERIES else None
+
+_current = contextvars.ContextVar("petcare_request_stats", default=None)
+
+
+# 🔹 SQLAlchemy Hooks
+def instrument_engine(engine):
+    """Attributes every statement run on `engine` to the request in the current context."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("petcare_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["petcare_query_start"].pop()
+        stats = _current.get()
+        if stats is None:
+            return  # Background jobs run outside any request
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if not statement.lstrip().upper().startswith("SELECT") and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+@event.listens_for(Session, "do_orm_execute")
+def _count_returned_rows(orm_execute_state):
+    """Counts the rows a session query returns: entities, column tuples, scalars and text() alike."""
+    stats = _current.get()
+    if stats is None or orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        return None  # DML is counted by rowcount in _record_query
+    options = orm_execute_state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None  # ✅ Never buffer a streamed result just to count it
+    result = orm_execute_state.invoke_statement()
+    if not getattr(result, "returns_rows", True):
+        return result
+    frozen = result.freeze()  # Buffers the rows once; the caller reads them from the frozen copy
+    stats.rows += len(frozen.data)
+    return frozen()
+
+
+# 🔹 Aggregation
+class RouteMetrics:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "queries", "db_seconds", "rows")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+_routes = {}  # (method, route template) -> RouteMetrics
+_lock = threading.Lock()
+
+def _observe(method, route, status, latency, stats):
+    with _lock:
+        metrics = _routes.get((method, route))
+        if metrics is None:
+            metrics = _routes[(method, route)] = RouteMetrics()
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                metrics.buckets[i] += 1
+        metrics.latency_sum += latency
+        metrics.count += 1
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.queries += stats.queries
+        metrics.db_seconds += stats.db_seconds
+        metrics.rows += stats.rows
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request and collecting the SQL it issued."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)  # Copied into the threadpool for sync handlers
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            # ✅ Response-cache hits never reach the router but name their route in the scope
+            template = getattr(route, "path", None) or scope.get("cached_route", "unmatched")
+            _observe(scope["method"], template, status, latency, stats)
+            if DEBUG_QUERIES and stats.queries > QUERY_BUDGET:
+                logger.warning(
+                    "%s %s issued %d SQL statements (budget %d, %.1f ms in DB):\n%s",
+                    scope["method"], template, stats.queries, QUERY_BUDGET, stats.db_seconds * 1000,
+                    "\n".join(stats.statements),
+                )
+
+
+# 🔹 Prometheus Exposition
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def render_metrics(extra_gauges=None, extra_counters=None):
+    """Renders all route metrics plus optional {name: value} gauges and counters in Prometheus text format.
+
+    Counter names must end in `_total`.
+    """
+    with _lock:
+        snapshot = {key: (list(m.buckets), m.latency_sum, m.count, dict(m.statuses), m.queries, m.db_seconds, m.rows)
+                    for key, m in _routes.items()}
+
+    lines = [
+        "# HELP petcare_request_duration_seconds Request latency by route.",
+        "# TYPE petcare_request_duration_seconds histogram",
+    ]
+    for (method, route), (buckets, latency_sum, count, *_rest) in sorted(snapshot.items()):
+        for bound, n in zip(LATENCY_BUCKETS, buckets):
+            lines.append(f"petcare_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {n}")
+        lines.append(f"petcare_request_duration_seconds_bucket{_labels(method=method, route=route, le='+Inf')} {count}")
+        lines.append(f"petcare_request_duration_seconds_sum{_labels(method=method, route=route)} {latency_sum}")
+        lines.append(f"petcare_request_duration_seconds_count{_labels(method=method, route=route)} {count}")
+
+    counters = [
+        ("petcare_requests_total", "Requests by route and status.", None),
+        ("petcare_db_queries_total", "SQL statements issued while serving each route.", 4),
+        ("petcare_db_query_seconds_total", "Time spent executing SQL for each route.", 5),
+        ("petcare_db_rows_total", "Rows returned by queries plus rows written for each route.", 6),
+    ]
+    for name, help_text, index in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (method, route), values in sorted(snapshot.items()):
+            if index is None:
+                for status, n in sorted(values[3].items()):
+                    lines.append(f"{name}{_labels(method=method, route=route, status=status)} {n}")
+            else:
+                lines.append(f"{name}{_labels(method=method, route=route)} {values[index]}")
+
+    for name, value in (extra_counters or {}).items():
+        lines += [f"# TYPE {name} counter", f"{name} {value}"]
+    for name, value in (extra_gauges or {}).items():
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Date
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Date, Index, LargeBinary, Float
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -30,7 +30,7 @@ class Pet(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     pet_type = Column(String, nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     owner = relationship("User", back_populates="pets")
     health_record = relationship("HealthRecord", back_populates="pet", uselist=False, cascade="all, delete-orphan")
@@ -47,20 +47,58 @@ class Caregiver(Base):
     # ✅ Fix conflicting relationships with overlaps
     bookings = relationship("Booking", back_populates="caregiver", overlaps="caregiver")
     reviews = relationship("Review", back_populates="caregiver") 
+    pet_type_entries = relationship("CaregiverPetType", cascade="all, delete-orphan")
+
+class CaregiverPetType(Base):
+    __tablename__ = "caregiver_pet_types"
+    __table_args__ = (
+        # ✅ Covers "caregivers for pet type X" without touching the caregivers table
+        Index("ix_caregiver_pet_types_pet_type", "pet_type", "caregiver_id"),
+    )
+
+    caregiver_id = Column(Integer, ForeignKey("caregivers.id", ondelete="CASCADE"), primary_key=True)
+    pet_type = Column(String, primary_key=True)
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # ✅ Lets the overlap check probe one caregiver's bookings by time range
+        Index("ix_bookings_caregiver_window", "caregiver_id", "starts_at", "ends_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    pet_id = Column(Integer, ForeignKey("pets.id"), nullable=False)
+    pet_id = Column(Integer, ForeignKey("pets.id"), nullable=False, index=True)
     caregiver_id = Column(Integer, ForeignKey("caregivers.id"), nullable=False)
     date = Column(String, nullable=False)
     time_from = Column(String, nullable=False)
     time_to = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    starts_at = Column(DateTime, nullable=True)  # Parsed from date + time_from
+    ends_at = Column(DateTime, nullable=True, index=True)  # Parsed from date + time_to for the expiry sweep
 
     caregiver = relationship("Caregiver", back_populates="bookings", overlaps="bookings")
 
+class CaregiverDaySlots(Base):
+    __tablename__ = "caregiver_day_slots"
+
+    caregiver_id = Column(Integer, ForeignKey("caregivers.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    busy = Column(LargeBinary, nullable=False)  # 96-bit bitmap, one bit per 15-minute slot
+
+class SweepState(Base):
+    __tablename__ = "sweep_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)  # Bookings ending at or before this are already expired
+    last_id = Column(Integer, nullable=True)  # Highest booking id an id-ordered pass has examined
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # "<hostname>:<pid>" of the current leader
+    expires_at = Column(DateTime, nullable=False)
+
 class Review(Base):
     __tablename__ = "reviews"
 
@@ -77,6 +115,26 @@ class Review(Base):
     owner = relationship("User", back_populates="reviews", passive_deletes=True)
     caregiver = relationship("Caregiver", back_populates="reviews")
 
+class CaregiverRating(Base):
+    __tablename__ = "caregiver_ratings"
+    __table_args__ = (
+        # ✅ Scanned backwards to serve the leaderboard in rank order
+        Index("ix_caregiver_ratings_rank", "rating_mean", "review_count"),
+    )
+
+    caregiver_id = Column(Integer, ForeignKey("caregivers.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_mean = Column(Float, nullable=False, default=0.0)
+    # Histogram: number of reviews per star rating
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
+
+    caregiver = relationship("Caregiver")
+
 class HealthRecord(Base):
     __tablename__ = "health_records"
     __table_args__ = {"extend_existing": True} 
@@ -88,11 +146,11 @@ class HealthRecord(Base):
     age_months = Column(Integer, nullable=True)
     health_conditions = Column(String, nullable=True)
     allergies = Column(String, nullable=True)
-    last_vaccination_date = Column(Date, nullable=True)
+    last_vaccination_date = Column(Date, nullable=True, index=True)
     vaccine_type = Column(String, nullable=True)
     medications = Column(String, nullable=True)
-    vet_name = Column(String, nullable=True)
+    vet_name = Column(String, nullable=True, index=True)
     vet_contact = Column(String, nullable=True)
-    last_checkup_date = Column(Date, nullable=True)
+    last_checkup_date = Column(Date, nullable=True, index=True)
 
     pet = relationship("Pet", back_populates="health_record")
@@ -1,40 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from database import SessionLocal, get_db
 from schemas import UserCreate, UserResponse, PetCreate, PetResponse, CaregiverResponse, CaregiverCreate, BookingCreate, BookingResponse, ReviewResponse, ReviewCreate, HealthRecordCreate, HealthRecordResponse
+from schemas import CaregiverRatingResponse, LeaderboardEntry, OwnerDashboard, DueReportEntry
+from schemas import BulkPetCreate, BulkHealthRecordCreate, BulkResult
 from crud import create_user, create_pet, get_user, get_pets, update_expired_availability
-from auth import create_access_token, verify_password, verify_access_token, oauth2_scheme
-from crud import adopt_pet, create_booking, create_caregiver, get_bookings, get_caregivers, get_reviews_by_caregiver, create_review, create_health_record
+from auth import create_access_token, verify_access_token, oauth2_scheme, principal_cache
+from auth import submit_hash_password, submit_verify_password, needs_rehash
+from crud import adopt_pet, create_booking, create_caregiver, get_caregiver, get_bookings, get_caregivers, get_reviews_by_caregiver, create_review, create_health_record
+from crud import get_available_caregivers, parse_fields, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from crud import get_rating_summary, get_leaderboard, get_user_by_id, user_cache, update_password_hash, get_owner_dashboard
+from crud import bulk_create_pets, bulk_create_bookings, bulk_create_health_records, MAX_BULK_ITEMS
+from crud import get_due_report
+from export import EXPORTS, MEDIA_TYPES, stream_export
+from search import search
+from archive import archive_expired_bookings
+from group_commit import run_write
+from events import booking_events, sse_stream
+from fast_json import dump_rows, list_fields
 from models import User, Caregiver  # ✅ Ensure User model is imported 
-from typing import List
+from typing import List, Optional
+from datetime import date
+import asyncio
 
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-
+def page_response(response: Response, rows, limit: int, fields, schema=None):
+    """Sends the keyset cursor in `X-Next-Cursor`; projected rows skip the response model."""
+    next_cursor = str(rows[-1].id) if len(rows) == limit else None
+    if fields is None:
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return rows
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if schema is not None:
+        # ✅ Column tuples go straight to JSON bytes through the schema's compiled serializer
+        return Response(dump_rows(schema, rows, fields), media_type="application/json", headers=headers)
+    content = jsonable_encoder([{f: row._mapping[f] for f in fields} for row in rows])
+    return JSONResponse(content, headers=headers)
+
+
+def _read_then_release(db: Session, fn, *args):
+    """Runs a crud read, then returns the session's connection to the pool before a slow hash."""
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
 
 # 🔹 User Registration
 @router.post("/register/", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    if get_user(db, user.username):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_read_then_release, db, get_user, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    return create_user(db, user.username, user.password)
+    # ✅ Awaited on the hash pool, holding neither a DB connection nor a threadpool thread
+    hashed_pw = await asyncio.wrap_future(submit_hash_password(user.password))
+    return await run_in_threadpool(run_write, db, create_user, user.username, hashed_pw)
 
 # 🔹 User Login
 
 @router.post("/login/")
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user(db, user.username)
+async def login(user: UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(_read_then_release, db, get_user, user.username)
 
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # ✅ Verify the password
-    if not verify_password(user.password, db_user.hashed_password):
+    # ✅ Verify the password on the hash worker pool
+    if not await asyncio.wrap_future(submit_verify_password(user.password, db_user.hashed_password)):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # ✅ Upgrade legacy SHA-256 hashes now that we know the plain password
+    if needs_rehash(db_user.hashed_password):
+        try:
+            rehashed = await asyncio.wrap_future(submit_hash_password(user.password))
+            await run_in_threadpool(run_write, db, update_password_hash, db_user.id, rehashed)
+        except HTTPException:
+            pass  # Pool is saturated; upgrade on a later login
+
     # ✅ Store the user ID (not username) in the token
     token = create_access_token({"sub": str(db_user.id)})
 
@@ -63,14 +111,30 @@ def get_current_user(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user ID in token")
 
-    # ✅ Fetch user from the database
-    db_user = db.query(User).filter(User.id == user_id).first()
+    # ✅ Fetch user from the cache, falling back to the database
+    db_user = get_user_by_id(db, user_id)
 
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     return db_user  # ✅ Return `UserResponse`
 
+# 🔹 Owner Dashboard
+@router.get("/me/dashboard", response_model=OwnerDashboard)
+def owner_dashboard(token: str = Header(..., description="Authentication Token"), db: Session = Depends(get_db)):
+    """The caller's pets with their health records, upcoming bookings and caregiver names."""
+    payload = verify_access_token(token)
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid authentication")
+    return get_owner_dashboard(db, user_id)
+
+@router.get("/auth/cache_stats")
+def auth_cache_stats():
+    """Hit/miss counters for the verified-token and user caches."""
+    return {"principals": principal_cache.stats(), "users": user_cache.stats()}
+
 # 🔹 Add Pet
 @router.post("/pets/", response_model=PetResponse)
 def add_pet(
@@ -91,14 +155,24 @@ def add_pet(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user ID in token")
 
-    return create_pet(db, user_id, pet.name, pet.pet_type)  # ✅ Use extracted user_id
+    return run_write(db, create_pet, user_id, pet.name, pet.pet_type)  # ✅ Use extracted user_id
 
 
 
 # 🔹 List Pets
 @router.get("/pets/", response_model=list[PetResponse])
-def list_pets(db: Session = Depends(get_db)):
-    return get_pets(db)
+def list_pets(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    owner_id: Optional[int] = None,
+    pet_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    projection = list_fields(parse_fields(fields, PetResponse), PetResponse)
+    pets = get_pets(db, after_id=after_id, limit=limit, owner_id=owner_id, pet_type=pet_type, fields=projection)
+    return page_response(response, pets, limit, projection, PetResponse)
 
 @router.post("/adopt/", response_model=PetResponse)
 def adopt_pet_route(
@@ -111,35 +185,123 @@ def adopt_pet_route(
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
-    return adopt_pet(db, user_id, pet)
+    return run_write(db, adopt_pet, user_id, pet)
 
 @router.post("/caregivers", response_model=CaregiverResponse)
-def register_caregiver(caregiver: CaregiverCreate, db: Session = Depends(get_db)):
-    return create_caregiver(db, caregiver)
+async def register_caregiver(caregiver: CaregiverCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_read_then_release, db, get_caregiver, caregiver.username):
+        raise HTTPException(status_code=400, detail="A caregiver with this username already exists")
+    hashed_password = await asyncio.wrap_future(submit_hash_password(caregiver.password))
+    return await run_in_threadpool(run_write, db, create_caregiver, caregiver, hashed_password)
 
 
 # 🔹 List Available Caregivers
-@router.get("/caregivers")
-def list_caregivers(db: Session = Depends(get_db)):
-    return get_caregivers(db)
+@router.get("/caregivers", response_model=List[CaregiverResponse])
+def list_caregivers(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    pet_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    projection = list_fields(parse_fields(fields, CaregiverResponse), CaregiverResponse)
+    caregivers = get_caregivers(db, after_id=after_id, limit=limit, pet_type=pet_type, fields=projection)
+    return page_response(response, caregivers, limit, projection, CaregiverResponse)
+
+
+# 🔹 Search Free Caregivers
+@router.get("/caregivers/available", response_model=List[CaregiverResponse])
+def list_available_caregivers(
+    pet_type: str, date: str, time_from: str, time_to: str, db: Session = Depends(get_db)
+):
+    """Caregivers who take `pet_type` and are free on `date` between time_from and time_to."""
+    return get_available_caregivers(db, pet_type, date, time_from, time_to)
 
 
 # 🔹 Create a Booking
 @router.post("/bookings/", response_model=BookingResponse)
 def book_caregiver(booking: BookingCreate, db: Session = Depends(get_db)):
-    return create_booking(db, booking)
+    return run_write(db, create_booking, booking)
 
 
 # 🔹 List All Bookings
 @router.get("/bookings/", response_model=list[BookingResponse])
-def list_bookings(db: Session = Depends(get_db)):
-    return get_bookings(db)
+def list_bookings(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    owner_id: Optional[int] = None,
+    caregiver_id: Optional[int] = None,
+    pet_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+):
+    projection = list_fields(parse_fields(fields, BookingResponse), BookingResponse)
+    bookings = get_bookings(
+        db, after_id=after_id, limit=limit, owner_id=owner_id, caregiver_id=caregiver_id,
+        pet_id=pet_id, date_from=date_from, date_to=date_to, fields=projection,
+        include_archived=include_archived,
+    )
+    return page_response(response, bookings, limit, projection, BookingResponse)
+
+# 🔹 Booking Status Stream
+@router.get("/bookings/stream")
+async def stream_bookings(
+    request: Request,
+    caregiver_id: Optional[int] = None,
+    token: Optional[str] = Header(None, description="Authentication Token"),
+):
+    """Server-sent events for the caller's bookings, or for `caregiver_id`'s bookings.
+
+    Sends `created` and `expired` events as bookings change, and `resync` if the client fell
+    so far behind that events were dropped (refetch /bookings/ and reconnect). Events are per
+    worker: run a single worker for this endpoint, as expiries come only from the leader.
+    """
+    if caregiver_id is not None:
+        topic = f"caregiver:{caregiver_id}"
+    else:
+        if token is None:
+            raise HTTPException(status_code=401, detail="Authentication token or caregiver_id required")
+        try:
+            topic = f"owner:{int(verify_access_token(token).get('sub'))}"
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=401, detail="Invalid authentication")
+
+    subscription = booking_events.subscribe(topic)
+    return StreamingResponse(
+        sse_stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# 🔹 Export a Table
+@router.get("/export/{table}")
+def export_table(table: str, request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Streams every row of bookings, pets or reviews as NDJSON or CSV, gzipped if the client accepts it."""
+    if table not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export, choose one of: {', '.join(EXPORTS)}")
+
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream_export(table, format, compress), media_type=MEDIA_TYPES[format], headers=headers)
 
 @router.post("/update_expired/")
 def update_expired(db: Session = Depends(get_db)):
     """Manually trigger expiry update."""
-    update_expired_availability(db)
-    return {"message": "Expired caregivers and bookings updated"}
+    stats = update_expired_availability(db)
+    return {"message": "Expired caregivers and bookings updated", **stats}
+
+@router.post("/archive_bookings/")
+def archive_bookings(db: Session = Depends(get_db)):
+    """Manually trigger archival of old expired bookings into monthly partitions."""
+    stats = archive_expired_bookings(db)
+    return {"message": "Expired bookings archived", **stats}
 
 @router.post("/reviews", response_model=ReviewResponse)
 # def submit_review(review: ReviewCreate, token: str = Header(..., description="Authentication Token"), db: Session = Depends(get_db)):
@@ -163,7 +325,7 @@ def submit_review(
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
-    return create_review(db, review, owner_id)
+    return run_write(db, create_review, review, owner_id)
 
 # @router.post("/reviews", response_model=ReviewResponse)
 # def submit_review(review: ReviewCreate, db: Session = Depends(get_db), token: dict = Depends(verify_access_token)):
@@ -178,9 +340,106 @@ def get_caregiver_reviews(caregiver_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="No reviews found")
     return reviews
 
+@router.get("/caregivers/rating", response_model=CaregiverRatingResponse)
+def get_caregiver_rating(caregiver_id: int, db: Session = Depends(get_db)):
+    """Review count, mean rating and 1-5 star histogram for a caregiver."""
+    summary = get_rating_summary(db, caregiver_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="No reviews found")
+    return summary
+
+@router.get("/caregivers/leaderboard", response_model=List[LeaderboardEntry])
+def caregiver_leaderboard(
+    limit: int = Query(10, ge=1, le=100), pet_type: Optional[str] = None, db: Session = Depends(get_db)
+):
+    """Top-N caregivers by mean rating, optionally only those taking `pet_type`."""
+    return get_leaderboard(db, limit, pet_type)
+
 @router.post("/pets/health_records", response_model=HealthRecordResponse)
 def add_health_record(pet_id: int, health_data: HealthRecordCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    return create_health_record(db, pet_id, health_data)
+    return run_write(db, create_health_record, pet_id, health_data)
+
+# 🔹 Vaccination and Checkup Due Report
+@router.get("/health_records/due", response_model=List[DueReportEntry])
+def due_report(
+    response: Response,
+    within_days: int = Query(30, ge=0, le=3650),
+    kind: str = Query("any", pattern="^(vaccination|checkup|any)$"),
+    pet_type: Optional[str] = None,
+    vet_name: Optional[str] = None,
+    include_missing: bool = False,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Pets overdue or due within `within_days` for vaccination, checkup or either.
+
+    `include_missing` also lists pets with no recorded vaccination/checkup date.
+    """
+    rows = get_due_report(
+        db, within_days=within_days, kind=kind, pet_type=pet_type, vet_name=vet_name,
+        include_missing=include_missing, after_id=after_id, limit=limit,
+    )
+    return page_response(response, rows, limit, None)
+
+# 🔹 Full-Text Search
+def search_page(response: Response, rows, limit: int, offset: int):
+    """Ranked results page by offset; the next offset is sent in `X-Next-Cursor`."""
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(offset + limit)
+    return rows
+
+@router.get("/search/reviews", response_model=List[ReviewResponse])
+def search_reviews(
+    response: Response,
+    q: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Reviews whose comment contains every word of `q`, best match first."""
+    return search_page(response, search(db, "reviews", q, limit=limit, offset=offset), limit, offset)
+
+@router.get("/search/health_records", response_model=List[HealthRecordResponse])
+def search_health_records(
+    response: Response,
+    q: str,
+    field: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Health records matching `q` in any text field, or only in `field` (e.g. allergies)."""
+    rows = search(db, "health_records", q, field=field, limit=limit, offset=offset)
+    return search_page(response, rows, limit, offset)
+
+# 🔹 Bulk Ingestion
+def _check_batch_size(items):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} records per request")
+
+@router.post("/pets/bulk", response_model=BulkResult)
+def add_pets_bulk(pets: List[BulkPetCreate], db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """Creates many pets in one transaction; invalid records are reported by index."""
+    _check_batch_size(pets)
+    return bulk_create_pets(db, pets)
+
+@router.post("/bookings/bulk", response_model=BulkResult)
+def add_bookings_bulk(bookings: List[BookingCreate], db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """Creates many bookings in one transaction; invalid or conflicting records are reported by index."""
+    _check_batch_size(bookings)
+    return bulk_create_bookings(db, bookings)
+
+@router.post("/pets/health_records/bulk", response_model=BulkResult)
+def add_health_records_bulk(
+    records: List[BulkHealthRecordCreate], db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)
+):
+    """Creates many health records in one transaction; invalid records are reported by index."""
+    _check_batch_size(records)
+    return bulk_create_health_records(db, records)
 
 # @router.delete("/delete_users", status_code=status.HTTP_200_OK)
 # def delete_user_account(
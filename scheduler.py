@@ -0,0 +1,149 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("petcare.scheduler")
+
+class ExpiryScheduler:
+    """Expires bookings at their end time from a min-heap of (ends_at, booking_id) deadlines.
+
+    The worker thread sleeps until the earliest deadline. The heap only holds bookings ending
+    before the discovery horizon (the next discovery run) and only while run() is active in
+    the leader; create_booking pushes those in directly (a no-op on standbys), and every `discover_interval` seconds discovery adds bookings that other
+    processes wrote plus older ones the horizon has moved over. Maintenance jobs passed to
+    run() as (interval, job(db)) pairs share the same loop. A failing step is logged and
+    retried after `retry_delay` seconds instead of ending the thread.
+    """
+
+    def __init__(self, discover_interval: float = 60.0, retry_delay: float = 5.0):
+        self.discover_interval = discover_interval
+        self.retry_delay = retry_delay
+        self._heap = []
+        self._scheduled = set()
+        self._max_seen_id = 0
+        self._horizon = None  # Bookings ending after this are left for a later discovery
+        self._cond = threading.Condition()
+        self._running = False
+
+    def schedule(self, booking_id: int, ends_at: datetime):
+        """Adds a booking's deadline, waking the worker if it is now the earliest one."""
+        with self._cond:
+            if not self._running:
+                return  # ✅ Standby worker: the leader's discovery finds the booking
+            if self._horizon is not None and ends_at > self._horizon:
+                return  # ✅ Discovery picks it up once the horizon reaches it
+            self._push(booking_id, ends_at)
+
+    def _push(self, booking_id: int, ends_at: datetime):
+        if booking_id in self._scheduled:
+            return
+        self._scheduled.add(booking_id)
+        heapq.heappush(self._heap, (ends_at, booking_id))
+        if self._heap[0][1] == booking_id:
+            self._cond.notify()
+
+    def wake(self):
+        """Wakes the worker so it rechecks its stop event."""
+        with self._cond:
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _pop_due(self, now: datetime):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            ends_at, booking_id = heapq.heappop(self._heap)
+            self._scheduled.discard(booking_id)
+            due.append((ends_at, booking_id))
+        return due
+
+    def _discover(self, db):
+        """Schedules active bookings ending before the new horizon: ones with ids above the last
+        seen (written since) and, by the ends_at index, ones the horizon has just moved over."""
+        from sqlalchemy import func
+        from models import Booking
+
+        horizon = datetime.now() + timedelta(seconds=self.discover_interval)
+        max_id = db.query(func.max(Booking.id)).scalar() or 0
+        due_soon = (Booking.is_active == True, Booking.ends_at <= horizon)
+        if self._horizon is None:
+            rows = db.query(Booking.id, Booking.ends_at).filter(*due_soon).all()
+        else:
+            rows = db.query(Booking.id, Booking.ends_at).filter(
+                *due_soon, Booking.id > self._max_seen_id, Booking.id <= max_id
+            ).all()
+            rows += db.query(Booking.id, Booking.ends_at).filter(*due_soon, Booking.ends_at > self._horizon).all()
+        with self._cond:
+            self._max_seen_id = max_id
+            self._horizon = horizon
+            for booking_id, ends_at in rows:
+                self._push(booking_id, ends_at)
+
+    def run(self, session_factory, stop: threading.Event, periodic=()):
+        """Worker loop: sleep until the next deadline, discovery or periodic job, then run what is due.
+
+        Returns once `stop` is set (followed by wake()); each leadership term passes a fresh event.
+        """
+        with self._cond:
+            self._heap, self._scheduled = [], set()
+            self._max_seen_id, self._horizon = 0, None
+            self._running = True
+        try:
+            self._run(session_factory, stop, periodic)
+        finally:
+            with self._cond:
+                self._running = False
+                self._heap, self._scheduled = [], set()
+
+    def _run(self, session_factory, stop, periodic):
+        from crud import expire_bookings
+
+        next_discovery = 0.0
+        next_runs = [time.monotonic() + interval for interval, _ in periodic]
+        while True:
+            if time.monotonic() >= next_discovery:
+                try:
+                    with session_factory() as db:
+                        self._discover(db)
+                    next_discovery = time.monotonic() + self.discover_interval
+                except Exception:
+                    logger.exception("Booking discovery failed; retrying in %ss", self.retry_delay)
+                    next_discovery = time.monotonic() + self.retry_delay
+            for i, (interval, job) in enumerate(periodic):
+                if time.monotonic() >= next_runs[i]:
+                    try:
+                        with session_factory() as db:
+                            job(db)
+                    except Exception:
+                        logger.exception("Periodic job %s failed", getattr(job, "__name__", job))
+                    next_runs[i] = time.monotonic() + interval
+
+            with self._cond:
+                if stop.is_set():
+                    return
+                timeout = min([next_discovery, *next_runs]) - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                if stop.is_set():
+                    return
+                due = self._pop_due(datetime.now())
+
+            if due:
+                try:
+                    with session_factory() as db:
+                        expire_bookings(db, [booking_id for _, booking_id in due])
+                except Exception:
+                    logger.exception("Expiring %d bookings failed; retrying in %ss", len(due), self.retry_delay)
+                    retry_at = datetime.now() + timedelta(seconds=self.retry_delay)
+                    with self._cond:
+                        for _, booking_id in due:
+                            self._push(booking_id, retry_at)
+
+# Shared by create_booking (producer) and the background thread started in main.py (consumer)
+expiry_scheduler = ExpiryScheduler()
@@ -74,6 +74,26 @@ class ReviewResponse(BaseModel):
         from_attributes = True
     # model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
 
+class CaregiverRatingResponse(BaseModel):
+    caregiver_id: int
+    review_count: int
+    rating_sum: int
+    rating_mean: float
+    stars_1: int
+    stars_2: int
+    stars_3: int
+    stars_4: int
+    stars_5: int
+
+    class Config:
+        from_attributes = True
+
+class LeaderboardEntry(BaseModel):
+    caregiver_id: int
+    username: str
+    review_count: int
+    rating_mean: float
+
 class HealthRecordCreate(BaseModel):
     age_years: Optional[int] = None
     age_months: Optional[int] = None
@@ -92,3 +112,46 @@ class HealthRecordResponse(HealthRecordCreate):
 
     class Config:
         from_attributes = True
+
+# 🔹 Owner Dashboard Schemas
+class DashboardBooking(BookingResponse):
+    caregiver_name: str
+
+class DashboardPet(PetResponse):
+    health_record: Optional[HealthRecordResponse] = None
+    upcoming_bookings: list[DashboardBooking]
+
+class OwnerDashboard(UserResponse):
+    pets: list[DashboardPet]
+
+# 🔹 Due Report Schema
+class DueReportEntry(BaseModel):
+    id: int  # Health record id, also the pagination cursor
+    pet_id: int
+    pet_name: str
+    pet_type: str
+    owner_id: int
+    vet_name: Optional[str] = None
+    vet_contact: Optional[str] = None
+    last_vaccination_date: Optional[date] = None
+    vaccination_due: Optional[date] = None
+    last_checkup_date: Optional[date] = None
+    checkup_due: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+# 🔹 Bulk Ingestion Schemas
+class BulkPetCreate(PetCreate):
+    owner_id: int
+
+class BulkHealthRecordCreate(HealthRecordCreate):
+    pet_id: int
+
+class BulkError(BaseModel):
+    index: int  # Position of the rejected record in the request
+    detail: str
+
+class BulkResult(BaseModel):
+    created: list[int]  # IDs of inserted rows, in request order
+    errors: list[BulkError]
@@ -0,0 +1,98 @@
+import sys
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from models import Review, HealthRecord
+
+# 🔹 Full-Text Search
+# External-content FTS5 tables: they store only the inverted index and read column values
+# back from the source tables, keyed by rowid == id.
+REVIEW_FIELDS = ("comment",)
+HEALTH_RECORD_FIELDS = ("health_conditions", "allergies", "medications", "vaccine_type", "vet_name")
+
+SEARCH_INDEXES = {
+    "reviews": ("reviews_fts", Review, REVIEW_FIELDS),
+    "health_records": ("health_records_fts", HealthRecord, HEALTH_RECORD_FIELDS),
+}
+
+def ensure_search_index(db: Session):
+    """Creates the FTS5 tables if missing and fills them from existing rows; returns True if built."""
+    existing = set(db.scalars(text("SELECT name FROM sqlite_master WHERE type = 'table'")))
+    missing = [name for name, (fts_table, _, _) in SEARCH_INDEXES.items() if fts_table not in existing]
+    for name in missing:
+        fts_table, model, fields = SEARCH_INDEXES[name]
+        db.execute(text(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5({', '.join(fields)}, "
+            f"content='{model.__tablename__}', content_rowid='id', tokenize='porter unicode61')"
+        ))
+        db.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+    db.commit()
+    return bool(missing)
+
+def rebuild_search_index(db: Session):
+    """Re-reads every source row into the FTS tables, then merges the index b-trees."""
+    for fts_table, _, _ in SEARCH_INDEXES.values():
+        db.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+        db.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')"))
+    db.commit()
+
+# 🔹 Incremental Maintenance (caller commits, so the index changes with the row)
+def _index_rows(db: Session, name: str, rows):
+    fts_table, _, fields = SEARCH_INDEXES[name]
+    if not rows:
+        return
+    columns = ", ".join(fields)
+    params = ", ".join(f":{f}" for f in fields)
+    db.execute(
+        text(f"INSERT INTO {fts_table}(rowid, {columns}) VALUES (:id, {params})"),
+        [{"id": row["id"], **{f: row.get(f) for f in fields}} for row in rows],
+    )
+
+def index_reviews(db: Session, rows):
+    """Adds {"id", "comment"} rows to the review index."""
+    _index_rows(db, "reviews", rows)
+
+def index_health_records(db: Session, rows):
+    """Adds {"id", <HEALTH_RECORD_FIELDS>} rows to the health-record index."""
+    _index_rows(db, "health_records", rows)
+
+# 🔹 Querying
+def to_match_query(q: str, field: Optional[str] = None):
+    """Turns free text into an FTS5 query: every word must match, `word*` matches a prefix."""
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    query = " AND ".join(terms)
+    return f"{field} : ({query})" if field else query
+
+def search(db: Session, name: str, q: str, field: Optional[str] = None, limit: int = 20, offset: int = 0):
+    """Returns rows matching `q`, best bm25 rank first."""
+    fts_table, model, fields = SEARCH_INDEXES[name]
+    if field is not None and field not in fields:
+        raise HTTPException(status_code=400, detail=f"Unknown field, choose one of: {', '.join(fields)}")
+    # ✅ The ranked page is read from the index alone; only its rows are fetched from the table
+    ids = list(db.scalars(
+        text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :q ORDER BY rank LIMIT :limit OFFSET :offset"),
+        {"q": to_match_query(q, field), "limit": limit, "offset": offset},
+    ))
+    if not ids:
+        return []
+    rows = {row.id: row for row in db.query(model).filter(model.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python search.py rebuild")
+    with SessionLocal() as db:
+        if not ensure_search_index(db):
+            rebuild_search_index(db)
+    print("Search index rebuilt")
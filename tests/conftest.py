@@ -0,0 +1,108 @@
+import hashlib
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+import pytest
+
+# database.py opens ./petcare.db against the working directory and reads PETCARE_* settings at
+# import time, so the test session runs in its own directory before any app module is imported
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="petcare-test-"))
+sys.path.insert(0, REPO_DIR)
+
+_names = itertools.count(1)
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}{next(_names)}"
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    from database import initialize_database
+
+    initialize_database(main.backfill_derived_tables)
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+
+    # ✅ Not entered as a context manager, so the lifespan's background jobs stay off
+    return TestClient(app)
+
+
+@pytest.fixture
+def db(app):
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def make_user(db):
+    """Inserts a user with a legacy SHA-256 hash (skips PBKDF2); returns (user, password)."""
+    from models import User
+
+    def make(password: str = "secret"):
+        user = User(username=unique("user"), hashed_password=hashlib.sha256(password.encode()).hexdigest())
+        db.add(user)
+        db.commit()
+        return user, password
+
+    return make
+
+
+@pytest.fixture
+def make_caregiver(db):
+    from models import Caregiver, CaregiverPetType
+
+    def make(pet_type: str = "dog"):
+        caregiver = Caregiver(
+            username=unique("caregiver"), hashed_password="-", pet_types=pet_type, is_active=True,
+            pet_type_entries=[CaregiverPetType(pet_type=pet_type)],
+        )
+        db.add(caregiver)
+        db.commit()
+        return caregiver
+
+    return make
+
+
+@pytest.fixture
+def make_pet(db, make_user):
+    from models import Pet
+
+    def make(pet_type: str = "dog", owner=None):
+        owner = owner or make_user()[0]
+        pet = Pet(name=unique("pet"), pet_type=pet_type, owner_id=owner.id)
+        db.add(pet)
+        db.commit()
+        return pet
+
+    return make
+
+
+def token_for(user) -> str:
+    from auth import create_access_token
+
+    return create_access_token({"sub": str(user.id)})
+
+
+def run_isolated(code: str, cwd: str = None, **env) -> str:
+    """Runs `code` in a fresh interpreter and (unless `cwd` is given) database directory, with extra PETCARE_* settings."""
+    result = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=cwd or tempfile.mkdtemp(prefix="petcare-test-"),
+        env={**os.environ, "PYTHONPATH": REPO_DIR, **env},
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
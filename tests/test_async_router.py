@@ -0,0 +1,42 @@
+from conftest import run_isolated
+
+
+def test_async_mode_publishes_each_operation_once():
+    output = run_isolated("""
+        import warnings
+        import main
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            schema = main.app.openapi()
+        assert not [w for w in caught if "Duplicate Operation ID" in str(w.message)]
+        ids = [op["operationId"] for path in schema["paths"].values() for op in path.values()]
+        assert len(ids) == len(set(ids)), ids
+        import router, async_router
+        # The shadowed sync /pets/ handlers are hidden; sync-only routes stay documented
+        print(sorted(r.include_in_schema for r in router.router.routes if r.path in ("/pets/", "/export/{table}")))
+    """, PETCARE_ASYNC_DB="1")
+    assert output.strip() == "[False, False, True]"
+
+
+def test_async_writes_go_through_group_commit():
+    output = run_isolated("""
+        import main
+        from database import initialize_database
+        from fastapi.testclient import TestClient
+        from group_commit import group_committer
+        from auth import create_access_token
+        initialize_database(main.backfill_derived_tables)
+        client = TestClient(main.app)
+        from models import User
+        from database import SessionLocal
+        with SessionLocal() as db:
+            user = User(username="owner", hashed_password="-")
+            db.add(user)
+            db.commit()
+        token = create_access_token({"sub": str(user.id)})
+        for name in ("a", "b"):
+            assert client.post("/pets/", json={"name": name, "pet_type": "dog"}, headers={"token": token}).status_code == 200
+        page = client.get("/pets/", params={"limit": 1})
+        print(group_committer.ops, page.headers["X-Next-Cursor"], len(page.json()))
+    """, PETCARE_ASYNC_DB="1", PETCARE_GROUP_COMMIT="1")
+    assert output.split() == ["2", "1", "1"]
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import auth
+import router
+from conftest import unique
+from database import engine
+from models import User
+
+
+def test_register_and_login(client):
+    username = unique("user")
+    registered = client.post("/register/", json={"username": username, "password": "pw"})
+    assert registered.status_code == 200
+    assert registered.json()["username"] == username
+    assert client.post("/register/", json={"username": username, "password": "pw"}).status_code == 400
+
+    assert client.post("/login/", json={"username": username, "password": "wrong"}).status_code == 401
+    assert client.post("/login/", json={"username": username, "password": "pw"}).json()["token_type"] == "bearer"
+
+
+def test_login_upgrades_legacy_hash(client, db, make_user):
+    user, password = make_user()
+    assert client.post("/login/", json={"username": user.username, "password": password}).status_code == 200
+    db.expire_all()
+    assert db.get(User, user.id).hashed_password.startswith(auth.HASH_SCHEME + "$")
+
+
+def test_password_check_holds_no_db_connection(client, make_user, monkeypatch):
+    user, password = make_user()
+    checked_out = []
+
+    def verify(plain, hashed):
+        checked_out.append(engine.pool.checkedout())
+        future = Future()
+        future.set_result(auth.verify_password(plain, hashed))
+        return future
+
+    monkeypatch.setattr(router, "submit_verify_password", verify)
+    monkeypatch.setattr(router, "needs_rehash", lambda hashed: False)
+    assert client.post("/login/", json={"username": user.username, "password": password}).status_code == 200
+    assert checked_out == [0]
+
+
+def test_full_hash_queue_is_rejected_with_503(client, make_user, monkeypatch):
+    user, password = make_user()
+    monkeypatch.setattr(auth, "_hash_slots", threading.BoundedSemaphore(1))
+    auth._hash_slots.acquire()  # Every admission slot is taken
+
+    response = client.post("/login/", json={"username": user.username, "password": password})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_hash_admission_stays_below_the_threadpool():
+    assert auth.HASH_WORKERS + auth.HASH_QUEUE_SIZE < 40
+
+
+def test_hash_pool_is_rebuilt_after_a_worker_dies():
+    with pytest.raises(BrokenProcessPool):
+        auth._submit_hash_job(os._exit, 1).result(timeout=60)
+    legacy = hashlib.sha256(b"pw").hexdigest()
+    assert auth.submit_verify_password("pw", legacy).result(timeout=60) is True
+
+
+def test_hash_pool_avoids_fork_and_shuts_down():
+    pool = auth._get_hash_pool()
+    assert pool._mp_context.get_start_method() == auth.HASH_START_METHOD != "fork"
+    auth.shutdown_hash_pool()
+    assert auth._hash_pool is None
+    assert auth.submit_hash_password("pw").result(timeout=60).startswith(auth.HASH_SCHEME + "$")
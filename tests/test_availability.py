@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+
+from archive import archive_expired_bookings
+from availability import SLOTS_PER_DAY, ensure_slot_bitmaps, from_bitmap, rebuild_day_slots, slot_mask
+from conftest import unique
+from crud import expire_bookings
+from models import Booking, CaregiverDaySlots
+
+
+def _at(day: str, clock: str) -> datetime:
+    return datetime.strptime(f"{day} {clock}", "%Y-%m-%d %I:%M %p")
+
+
+def test_slot_mask_rounds_out_to_whole_slots():
+    day = "2024-05-01"
+    # 10:05-10:20 touches the 10:00 and 10:15 slots
+    assert slot_mask(_at(day, "10:05 AM"), _at(day, "10:20 AM")) == 0b11 << 40
+    assert slot_mask(_at(day, "10:00 AM"), _at(day, "10:15 AM")) == 1 << 40
+    # Adjacent windows share no slot
+    assert not slot_mask(_at(day, "09:00 AM"), _at(day, "10:00 AM")) & slot_mask(_at(day, "10:00 AM"), _at(day, "11:00 AM"))
+    # The day's last slot is the highest bit; empty windows mark nothing
+    assert slot_mask(_at(day, "11:45 PM"), _at(day, "11:59 PM")) == 1 << (SLOTS_PER_DAY - 1)
+    assert slot_mask(_at(day, "10:00 AM"), _at(day, "10:00 AM")) == 0
+
+
+def _available(client, pet_type, day, time_from, time_to):
+    response = client.get("/caregivers/available", params={
+        "pet_type": pet_type, "date": day, "time_from": time_from, "time_to": time_to,
+    })
+    assert response.status_code == 200
+    return [caregiver["id"] for caregiver in response.json()]
+
+
+def test_available_caregivers_exclude_overlapping_bookings(client, make_pet, make_caregiver):
+    pet_type = unique("breed")
+    caregiver, pet = make_caregiver(pet_type), make_pet(pet_type)
+    day = (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d")
+    booking = {"pet_id": pet.id, "caregiver_id": caregiver.id, "date": day, "time_from": "10:05 AM", "time_to": "11:20 AM"}
+    assert client.post("/bookings/", json=booking).status_code == 200
+
+    assert _available(client, pet_type, day, "11:00 AM", "12:00 PM") == []
+    # Slot-granular: 11:20 rounds up to 11:30, and 10:05 down to 10:00
+    assert _available(client, pet_type, day, "11:25 AM", "12:00 PM") == []
+    assert _available(client, pet_type, day, "09:30 AM", "10:00 AM") == [caregiver.id]
+    assert _available(client, pet_type, day, "11:30 AM", "12:00 PM") == [caregiver.id]
+    # Same hours on the next day are free
+    next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    assert _available(client, pet_type, next_day, "10:00 AM", "11:00 AM") == [caregiver.id]
+
+
+def _active_booking(db, pet, caregiver, starts_at, ends_at):
+    from availability import mark_booking_slots
+
+    booking = Booking(
+        pet_id=pet.id, caregiver_id=caregiver.id, date=starts_at.strftime("%Y-%m-%d"),
+        time_from=starts_at.strftime("%I:%M %p"), time_to=ends_at.strftime("%I:%M %p"),
+        starts_at=starts_at, ends_at=ends_at, is_active=True,
+    )
+    db.add(booking)
+    mark_booking_slots(db, caregiver.id, starts_at, ends_at)
+    db.commit()
+    return booking
+
+
+def test_expired_booking_frees_its_slots(client, db, make_pet, make_caregiver):
+    pet_type = unique("breed")
+    caregiver, pet = make_caregiver(pet_type), make_pet(pet_type)
+    day = "2020-03-03"
+    morning = _active_booking(db, pet, caregiver, _at(day, "09:00 AM"), _at(day, "10:00 AM"))
+    noon = _active_booking(db, pet, caregiver, _at(day, "12:00 PM"), _at(day, "01:00 PM"))
+    assert _available(client, pet_type, day, "09:30 AM", "12:30 PM") == []
+
+    assert expire_bookings(db, [morning.id]) == 1
+    assert _available(client, pet_type, day, "09:00 AM", "10:00 AM") == [caregiver.id]
+    assert _available(client, pet_type, day, "12:30 PM", "01:00 PM") == []
+
+    # The last booking of the day going away deletes the day's row
+    assert expire_bookings(db, [noon.id]) == 1
+    assert db.get(CaregiverDaySlots, (caregiver.id, date(2020, 3, 3))) is None
+
+
+def test_rebuild_recomputes_bitmaps_from_active_bookings(db, make_pet, make_caregiver):
+    caregiver, pet = make_caregiver(), make_pet()
+    day = (datetime.now() + timedelta(days=9)).strftime("%Y-%m-%d")
+    first = _active_booking(db, pet, caregiver, _at(day, "08:00 AM"), _at(day, "09:00 AM"))
+    second = _active_booking(db, pet, caregiver, _at(day, "02:00 PM"), _at(day, "02:30 PM"))
+    key = (caregiver.id, first.starts_at.date())
+
+    # Rebuilding from scratch reproduces the incrementally marked bitmap
+    db.query(CaregiverDaySlots).delete()
+    db.commit()
+    assert ensure_slot_bitmaps(db) >= 2
+    expected = slot_mask(first.starts_at, first.ends_at) | slot_mask(second.starts_at, second.ends_at)
+    assert from_bitmap(db.get(CaregiverDaySlots, key).busy) == expected
+    assert ensure_slot_bitmaps(db) == 0  # Only runs while the table is empty
+
+    first.is_active = False
+    db.commit()
+    rebuild_day_slots(db, *key)
+    db.commit()
+    assert from_bitmap(db.get(CaregiverDaySlots, key).busy) == slot_mask(second.starts_at, second.ends_at)
+
+
+def test_archival_prunes_bitmaps_before_the_cutoff(db, make_caregiver):
+    caregiver = make_caregiver()
+    stale_day = date.today() - timedelta(days=400)
+    db.add(CaregiverDaySlots(caregiver_id=caregiver.id, day=stale_day, busy=bytes(12)))
+    db.commit()
+
+    assert archive_expired_bookings(db)["pruned_day_slots"] >= 1
+    assert db.get(CaregiverDaySlots, (caregiver.id, stale_day)) is None
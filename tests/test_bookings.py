@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from crud import update_expired_availability, EXPIRY_SWEEP
+from models import Booking, SweepState
+
+
+def _booking(pet, caregiver, starts_at, ends_at, is_active=True):
+    return Booking(
+        pet_id=pet.id, caregiver_id=caregiver.id, date=starts_at.strftime("%Y-%m-%d"),
+        time_from=starts_at.strftime("%I:%M %p"), time_to=ends_at.strftime("%I:%M %p"),
+        starts_at=starts_at, ends_at=ends_at, is_active=is_active,
+    )
+
+
+def test_sweep_watermark_stops_at_the_latest_expired_booking(db, make_pet, make_caregiver):
+    pet, caregiver = make_pet(), make_caregiver()
+    now = datetime.now().replace(microsecond=0)
+    first = _booking(pet, caregiver, now - timedelta(hours=3), now - timedelta(hours=2))
+    db.add(first)
+    db.commit()
+
+    update_expired_availability(db)
+    db.refresh(first)
+    assert first.is_active is False
+    assert db.get(SweepState, EXPIRY_SWEEP).watermark >= first.ends_at
+
+    # Committed after that sweep but ending before it ran: must not fall behind the watermark
+    late = _booking(pet, caregiver, now - timedelta(minutes=90), now - timedelta(minutes=61))
+    db.add(late)
+    db.commit()
+    assert late.ends_at > db.get(SweepState, EXPIRY_SWEEP).watermark
+
+    assert update_expired_availability(db)["expired"] >= 1
+    db.refresh(late)
+    assert late.is_active is False
+
+
+def _request(pet, caregiver, day, time_from, time_to):
+    return {"pet_id": pet.id, "caregiver_id": caregiver.id, "date": day, "time_from": time_from, "time_to": time_to}
+
+
+def test_overlapping_booking_is_rejected(client, make_pet, make_caregiver):
+    pet, caregiver = make_pet(), make_caregiver()
+    day = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+
+    assert client.post("/bookings/", json=_request(pet, caregiver, day, "10:00 AM", "12:00 PM")).status_code == 200
+    overlap = client.post("/bookings/", json=_request(make_pet(), caregiver, day, "11:30 AM", "01:00 PM"))
+    assert overlap.status_code == 409
+    # Back-to-back is not an overlap
+    assert client.post("/bookings/", json=_request(make_pet(), caregiver, day, "12:00 PM", "01:00 PM")).status_code == 200
+
+
+def test_malformed_legacy_bookings_are_logged_once(db, make_pet, make_caregiver, caplog):
+    pet, caregiver = make_pet(), make_caregiver()
+    db.add(Booking(pet_id=pet.id, caregiver_id=caregiver.id, date="someday", time_from="noon", time_to="later"))
+    db.add(Booking(pet_id=pet.id, caregiver_id=caregiver.id, date="2020-01-02", time_from="09:00 AM", time_to="10:00 AM"))
+    db.commit()
+
+    with caplog.at_level("WARNING", logger="petcare.crud"):
+        stats = update_expired_availability(db)
+        again = update_expired_availability(db)
+    assert (stats["backfilled"], stats["skipped"]) == (1, 1)
+    assert (again["backfilled"], again["skipped"]) == (0, 0)
+    assert len([r for r in caplog.records if "invalid date/time" in r.getMessage()]) == 1
+
+
+def test_created_booking_is_published_after_commit(client, make_pet, make_caregiver, monkeypatch):
+    from events import booking_events
+
+    pet, caregiver = make_pet(), make_caregiver()
+    published = []
+    monkeypatch.setattr(booking_events, "has_subscribers", lambda: True)
+    monkeypatch.setattr(booking_events, "publish", published.extend)
+    day = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+
+    response = client.post("/bookings/", json=_request(pet, caregiver, day, "09:00 AM", "10:00 AM"))
+    assert response.status_code == 200
+    [(topics, payload)] = published
+    assert topics == (f"owner:{pet.owner_id}", f"caregiver:{caregiver.id}")
+    assert payload["type"] == "created" and payload["booking"]["id"] == response.json()["id"]
+
+
+def test_archived_bookings_stay_listed_with_include_archived(client, db, make_pet, make_caregiver):
+    pet, caregiver = make_pet(), make_caregiver()
+    now = datetime.now().replace(microsecond=0)
+    old = [_booking(pet, caregiver, now - timedelta(days=d, hours=1), now - timedelta(days=d), is_active=False) for d in (90, 60)]
+    recent = _booking(pet, caregiver, now + timedelta(days=1), now + timedelta(days=1, hours=1))
+    db.add_all(old + [recent])  # `recent` gets the newest id, which always stays live
+    db.commit()
+
+    archived = client.post("/archive_bookings/").json()
+    assert archived["archived"] >= 2
+
+    live = client.get("/bookings/", params={"pet_id": pet.id}).json()
+    everything = client.get("/bookings/", params={"pet_id": pet.id, "include_archived": True}).json()
+    assert [b["id"] for b in live] == [recent.id]
+    assert [b["id"] for b in everything] == sorted(b.id for b in old + [recent])
+
+
+def test_caregiver_reviews_is_only_served_at_its_get_route():
+    import router
+
+    routes = {(route.path, method): route.endpoint.__name__ for route in router.router.routes for method in route.methods}
+    assert routes[("/reviews", "POST")] == "submit_review"
+    assert [key for key, name in routes.items() if name == "get_caregiver_reviews"] == [("/caregivers/reviews", "GET")]
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import crud
+from conftest import token_for, unique
+from models import Booking, HealthRecord, Pet
+
+MISSING_ID = 10**9
+
+
+def _post(client, path, user, items):
+    return client.post(path, json=items, headers={"token": token_for(user)})
+
+
+def test_bulk_pets_report_unknown_owners_and_keep_request_order(client, db, make_user):
+    owner = make_user()[0]
+    names = [unique("pet") for _ in range(4)]
+    items = [{"name": name, "pet_type": "cat", "owner_id": owner.id} for name in names]
+    items[1]["owner_id"] = MISSING_ID
+
+    result = _post(client, "/pets/bulk", owner, items).json()
+    assert result["errors"] == [{"index": 1, "detail": "User not found"}]
+    # RETURNING ids line up with the accepted records in request order
+    created = {pet_id: db.get(Pet, pet_id).name for pet_id in result["created"]}
+    assert list(created.values()) == [names[0], names[2], names[3]]
+    assert db.query(Pet).filter(Pet.name == names[1]).count() == 0
+
+
+def test_bulk_bookings_check_rows_against_the_batch_and_the_database(client, db, make_user, make_pet, make_caregiver):
+    pet_type = unique("breed")
+    caregiver, pet, cat = make_caregiver(pet_type), make_pet(pet_type), make_pet("cat")
+    day = (datetime.now() + timedelta(days=12)).strftime("%Y-%m-%d")
+    existing = {"pet_id": pet.id, "caregiver_id": caregiver.id, "date": day, "time_from": "03:00 PM", "time_to": "04:00 PM"}
+    assert client.post("/bookings/", json=existing).status_code == 200
+
+    def booking(time_from, time_to, **overrides):
+        return {"pet_id": pet.id, "caregiver_id": caregiver.id, "date": day, "time_from": time_from,
+                "time_to": time_to, **overrides}
+
+    items = [
+        booking("09:00 AM", "10:00 AM"),
+        booking("09:30 AM", "10:30 AM"),  # Overlaps the first row of this batch
+        booking("10:00 AM", "11:00 AM"),  # Adjacent to the first row
+        booking("09:00 AM", "10:00 AM", caregiver_id=MISSING_ID),
+        booking("09:00 AM", "10:00 AM", pet_id=MISSING_ID),
+        booking("01:00 PM", "02:00 PM", pet_id=cat.id),
+        booking("9am", "10am"),
+        booking("02:00 PM", "01:00 PM"),
+        booking("03:30 PM", "05:00 PM"),  # Overlaps the booking already in the database
+    ]
+    result = _post(client, "/bookings/bulk", make_user()[0], items).json()
+
+    assert result["errors"] == [
+        {"index": 1, "detail": "Caregiver is already booked for this time slot"},
+        {"index": 3, "detail": "Caregiver not found or no longer available"},
+        {"index": 4, "detail": "Pet not found"},
+        {"index": 5, "detail": "Caregiver does not take care of cat"},
+        {"index": 6, "detail": "Invalid date/time format, expected YYYY-MM-DD and HH:MM AM/PM"},
+        {"index": 7, "detail": "Booking must end after it starts"},
+        {"index": 8, "detail": "Caregiver is already booked for this time slot"},
+    ]
+    stored = [db.get(Booking, booking_id) for booking_id in result["created"]]
+    assert [(b.time_from, b.time_to) for b in stored] == [("09:00 AM", "10:00 AM"), ("10:00 AM", "11:00 AM")]
+    assert db.query(Booking).filter(Booking.caregiver_id == caregiver.id).count() == 3
+    # The accepted rows block their slots for later requests
+    assert crud.get_available_caregivers(db, pet_type, day, "10:30 AM", "11:00 AM") == []
+
+
+def test_bulk_health_records_allow_one_record_per_pet(client, db, make_user, make_pet):
+    user = make_user()[0]
+    pet, other, has_record = make_pet(), make_pet(), make_pet()
+    db.add(HealthRecord(pet_id=has_record.id))
+    db.commit()
+
+    items = [
+        {"pet_id": pet.id, "allergies": "pollen"},
+        {"pet_id": pet.id, "allergies": "dust"},  # Second record for the same pet in the batch
+        {"pet_id": MISSING_ID},
+        {"pet_id": has_record.id},
+        {"pet_id": other.id, "allergies": "none"},
+    ]
+    result = _post(client, "/pets/health_records/bulk", user, items).json()
+
+    assert result["errors"] == [
+        {"index": 1, "detail": "Pet already has a health record"},
+        {"index": 2, "detail": "Pet not found"},
+        {"index": 3, "detail": "Pet already has a health record"},
+    ]
+    stored = [db.get(HealthRecord, record_id) for record_id in result["created"]]
+    assert [(r.pet_id, r.allergies) for r in stored] == [(pet.id, "pollen"), (other.id, "none")]
+
+
+def test_bulk_requests_reject_malformed_and_oversized_batches(client, db, make_user, monkeypatch):
+    owner = make_user()[0]
+    malformed = [{"name": unique("pet"), "pet_type": "dog", "owner_id": owner.id}, {"name": "no owner", "pet_type": "dog"}]
+    assert _post(client, "/pets/bulk", owner, malformed).status_code == 422
+    assert db.query(Pet).filter(Pet.name == malformed[0]["name"]).count() == 0  # Nothing from the batch is kept
+
+    monkeypatch.setattr("router.MAX_BULK_ITEMS", 1)
+    items = [{"name": unique("pet"), "pet_type": "dog", "owner_id": owner.id} for _ in range(2)]
+    assert _post(client, "/pets/bulk", owner, items).status_code == 413
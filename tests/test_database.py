@@ -0,0 +1,59 @@
+from conftest import run_isolated
+
+
+def test_production_profile_routes_reads_to_the_read_only_pool():
+    output = run_isolated("""
+        import main
+        from fastapi import Request
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        import database
+        database.initialize_database(main.backfill_derived_tables)
+
+        def session_for(method):
+            return next(database.get_db(Request({"type": "http", "method": method, "headers": []})))
+
+        reader, writer = session_for("GET"), session_for("POST")
+        assert reader.get_bind() is database.read_engine and writer.get_bind() is database.engine
+        writer.execute(text("INSERT INTO users (username, hashed_password) VALUES ('w', '-')"))
+        writer.commit()
+        print(reader.execute(text("SELECT count(*) FROM users")).scalar())
+        try:
+            reader.execute(text("INSERT INTO users (username, hashed_password) VALUES ('r', '-')"))
+        except OperationalError as exc:
+            print("read-only" if "readonly" in str(exc) else exc)
+    """, PETCARE_DB_PROFILE="production")
+    assert output.split() == ["1", "read-only"]
+
+
+def test_startup_skips_migration_until_the_models_change():
+    output = run_isolated("""
+        from sqlalchemy import Column, String, inspect, text
+        import database
+        from models import Pet
+        backfills = []
+        migrated = [database.initialize_database(lambda: backfills.append(1)) for _ in range(2)]
+        with database.engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (username, hashed_password) VALUES ('kept', '-')"))
+
+        Pet.__table__.append_column(Column("nickname", String, nullable=True))
+        migrated.append(database.initialize_database(lambda: backfills.append(1)))
+        with database.engine.connect() as conn:
+            columns = {c["name"] for c in inspect(conn).get_columns("pets")}
+            users = conn.execute(text("SELECT count(*) FROM users")).scalar()
+        print(migrated, len(backfills), "nickname" in columns, users)
+    """)
+    assert output.strip() == "[True, False, True] 2 True 1"
+
+
+def test_second_startup_only_checks_the_schema(tmp_path):
+    code = """
+        import main
+        from fastapi.testclient import TestClient
+        with TestClient(main.app) as client:
+            assert client.get("/caregivers").status_code == 200
+        print(*sorted(main.startup_timings))
+    """
+    first, second = (run_isolated(code, cwd=str(tmp_path)).split() for _ in range(2))
+    assert "migrate" in first and "schema_check" not in first
+    assert "schema_check" in second and "migrate" not in second
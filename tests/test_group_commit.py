@@ -0,0 +1,67 @@
+import threading
+
+from conftest import run_isolated, unique
+from database import SessionLocal, engine
+from group_commit import GroupCommitter
+from models import User
+
+
+def test_rolled_back_operation_does_not_affect_its_batch(app):
+    committer = GroupCommitter(window=0.2)
+    failing, kept = unique("user"), unique("user")
+    start = threading.Barrier(2)
+
+    def add_then_fail(db):
+        db.add(User(username=failing, hashed_password="-"))
+        db.flush()
+        raise ValueError("rejected")
+
+    def add(db):
+        db.add(User(username=kept, hashed_password="-"))
+        return kept
+
+    futures = []
+    def submit(fn):
+        start.wait()
+        futures.append(committer.submit(engine, fn))
+    threads = [threading.Thread(target=submit, args=(fn,)) for fn in (add_then_fail, add)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    for future in futures:
+        try:
+            results["ok"] = future.result(timeout=10)
+        except ValueError:
+            results["error"] = True
+    assert results == {"ok": kept, "error": True}
+    assert committer.stats() == {"batches": 1, "ops": 2}
+    with SessionLocal() as db:
+        assert db.query(User).filter(User.username == failing).count() == 0
+        assert db.query(User).filter(User.username == kept).count() == 1
+
+
+def test_group_commit_writes_under_the_production_profile():
+    output = run_isolated("""
+        import main
+        from database import initialize_database
+        from fastapi.testclient import TestClient
+        from group_commit import group_committer
+        initialize_database(main.backfill_derived_tables)
+        client = TestClient(main.app)
+
+        assert client.post("/register/", json={"username": "owner", "password": "pw"}).status_code == 200
+        token = client.post("/login/", json={"username": "owner", "password": "pw"}).json()["access_token"]
+        pet = client.post("/pets/", json={"name": "rex", "pet_type": "dog"}, headers={"token": token})
+        assert pet.status_code == 200, pet.text
+        record = client.post(
+            "/pets/health_records", params={"pet_id": pet.json()["id"]},
+            json={"age_years": 3, "allergies": "none"},
+            headers={"token": token},
+        )
+        assert record.status_code == 200, record.text
+        print(group_committer.ops)
+    """, PETCARE_DB_PROFILE="production", PETCARE_GROUP_COMMIT="1")
+    assert int(output) >= 3
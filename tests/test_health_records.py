@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+import crud
+from conftest import unique
+from models import HealthRecord
+
+
+def _overdue_record(db, make_pet, vet_name):
+    db.add(HealthRecord(pet_id=make_pet().id, vet_name=vet_name, last_vaccination_date=date.today() - timedelta(days=400)))
+    db.commit()
+
+
+def test_due_report_entries_expire_after_the_ttl(db, make_pet, monkeypatch):
+    vet = unique("vet")
+    _overdue_record(db, make_pet, vet)
+    assert len(crud.get_due_report(db, vet_name=vet)) == 1
+
+    # Written by another worker: this process's generation is not bumped
+    _overdue_record(db, make_pet, vet)
+    assert len(crud.get_due_report(db, vet_name=vet)) == 1
+
+    monkeypatch.setattr(crud, "DUE_REPORT_CACHE_TTL", 0)
+    crud.due_report_cache.clear()
+    crud.get_due_report(db, vet_name=vet)
+    _overdue_record(db, make_pet, vet)
+    assert len(crud.get_due_report(db, vet_name=vet)) == 3
+
@@ -0,0 +1,46 @@
+import re
+from datetime import date, timedelta
+
+from conftest import token_for
+from models import HealthRecord
+
+
+def _metric(text, name, route):
+    match = re.search(rf'^{name}{{method="GET",route="{re.escape(route)}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_tuple_queries_count_returned_rows(client, db, make_pet):
+    pets = [make_pet() for _ in range(3)]
+    pet = pets[0]
+    for due_pet in pets:
+        db.add(HealthRecord(pet_id=due_pet.id, last_vaccination_date=date.today() - timedelta(days=400)))
+    db.commit()
+    headers = {"token": token_for(pet.owner)}
+
+    rows = client.get("/health_records/due", params={"kind": "vaccination", "limit": 1000}, headers=headers).json()
+    assert any(row["pet_id"] == pet.id for row in rows)
+    client.get("/me/dashboard", headers=headers)
+
+    text = client.get("/metrics").text
+    assert len(rows) >= 3
+    assert _metric(text, "petcare_db_rows_total", "/health_records/due") >= len(rows)
+    # The owner, their pet and its health record
+    assert _metric(text, "petcare_db_rows_total", "/me/dashboard") >= 3
+
+
+def test_monotonic_values_are_exported_as_counters(client):
+    text = client.get("/metrics").text
+    assert "# TYPE petcare_response_cache_hits_total counter" in text
+    assert "# TYPE petcare_group_commit_ops_total counter" in text
+    assert "# TYPE petcare_response_cache_size gauge" in text
+    assert not re.search(r"^# TYPE \S+_total gauge$", text, re.M)
+
+
+def test_cached_responses_are_counted_under_their_route(client):
+    for _ in range(3):
+        assert client.get("/caregivers", params={"limit": 7}).status_code == 200
+
+    text = client.get("/metrics").text
+    assert re.search(r'^petcare_requests_total\{method="GET",route="/caregivers",status="200"\} ([3-9]|\d\d+)$', text, re.M)
+    assert 'route="unmatched",status="200"' not in text
@@ -0,0 +1,39 @@
+import time
+
+import response_cache
+from conftest import token_for, unique
+from models import Pet
+
+
+def _pet_names(client, owner):
+    return [pet["name"] for pet in client.get("/pets/", params={"owner_id": owner.id}).json()]
+
+
+def test_write_invalidates_cached_listing(client, make_user):
+    owner = make_user()[0]
+    assert _pet_names(client, owner) == []
+    hits = response_cache.response_cache.hits
+    assert _pet_names(client, owner) == []
+    assert response_cache.response_cache.hits == hits + 1
+
+    created = client.post("/pets/", json={"name": "rex", "pet_type": "dog"}, headers={"token": token_for(owner)})
+    assert created.status_code == 200
+    assert _pet_names(client, owner) == ["rex"]
+
+
+def test_etag_revalidation(client):
+    first = client.get("/caregivers")
+    assert client.get("/caregivers", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+
+def test_entries_expire_for_writes_on_other_workers(client, db, make_user, monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_TTL", 0.05)
+    owner = make_user()[0]
+    assert _pet_names(client, owner) == []
+
+    # Written straight to the database, as another worker would, without bumping this one's tags
+    db.add(Pet(name=unique("pet"), pet_type="cat", owner_id=owner.id))
+    db.commit()
+    assert _pet_names(client, owner) == []
+    time.sleep(0.1)
+    assert len(_pet_names(client, owner)) == 1
@@ -0,0 +1,185 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import crud
+from database import SessionLocal
+from models import Booking
+from conftest import run_isolated
+from scheduler import ExpiryScheduler
+
+
+def _booking(db, pet, caregiver, ends_at):
+    starts_at = ends_at - timedelta(hours=1)
+    booking = Booking(
+        pet_id=pet.id, caregiver_id=caregiver.id, date=starts_at.strftime("%Y-%m-%d"),
+        time_from=starts_at.strftime("%I:%M %p"), time_to=ends_at.strftime("%I:%M %p"),
+        starts_at=starts_at, ends_at=ends_at, is_active=True,
+    )
+    db.add(booking)
+    db.commit()
+    return booking
+
+
+def test_discovery_only_loads_bookings_ending_before_the_horizon(db, make_pet, make_caregiver):
+    pet, caregiver = make_pet(), make_caregiver()
+    soon = _booking(db, pet, caregiver, datetime.now() + timedelta(minutes=10))
+    later = _booking(db, pet, caregiver, datetime.now() + timedelta(days=30))
+    scheduler = ExpiryScheduler(discover_interval=3600)
+    scheduler._running = True
+
+    scheduler._discover(db)
+    scheduler.schedule(later.id, later.ends_at)
+    assert soon.id in scheduler._scheduled
+    assert later.id not in scheduler._scheduled
+
+    # Once the horizon moves past it, the next discovery picks the later booking up
+    scheduler.discover_interval = 31 * 24 * 3600
+    scheduler._discover(db)
+    assert later.id in scheduler._scheduled
+
+
+def test_failed_expiry_is_logged_and_retried(db, make_pet, make_caregiver, monkeypatch, caplog):
+    booking = _booking(db, make_pet(), make_caregiver(), datetime.now() - timedelta(minutes=1))
+    expire_bookings = crud.expire_bookings
+    calls = []
+
+    def flaky(session, booking_ids):
+        calls.append(booking_ids)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return expire_bookings(session, booking_ids)
+
+    monkeypatch.setattr(crud, "expire_bookings", flaky)
+    scheduler = ExpiryScheduler(discover_interval=3600, retry_delay=0.1)
+    stop = threading.Event()
+    worker = threading.Thread(target=scheduler.run, args=(SessionLocal, stop))
+    with caplog.at_level("ERROR", logger="petcare.scheduler"):
+        worker.start()
+        deadline = time.monotonic() + 10
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        stop.set()
+        scheduler.wake()
+        worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert any(booking.id in ids for ids in calls[1:])
+    assert "Expiring" in caplog.text
+    db.refresh(booking)
+    assert booking.is_active is False
+
+
+def test_standby_workers_do_not_schedule(db, make_pet, make_caregiver):
+    booking = _booking(db, make_pet(), make_caregiver(), datetime.now() + timedelta(minutes=5))
+    scheduler = ExpiryScheduler()
+    scheduler.schedule(booking.id, booking.ends_at)
+    assert scheduler.pending() == 0
+
+
+def test_stop_set_before_run_returns_immediately():
+    stop = threading.Event()
+    stop.set()
+    scheduler = ExpiryScheduler()
+    worker = threading.Thread(target=scheduler.run, args=(SessionLocal, stop))
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+
+
+def test_losing_the_lease_stops_the_leaders_jobs():
+    output = run_isolated(
+        """
+        import threading, time
+        from datetime import datetime, timedelta
+        import leader
+        from database import SessionLocal, initialize_database
+        from models import Lease
+        from scheduler import ExpiryScheduler
+
+        initialize_database()
+        leader.LEASE_RENEW_INTERVAL = 0.05
+        scheduler = ExpiryScheduler()
+        terms = []
+
+        def job(stop):
+            terms.append(stop)
+            scheduler.run(SessionLocal, stop)
+
+        threading.Thread(
+            target=leader.run_as_leader, args=(job, scheduler.wake, SessionLocal, "unused.lock"), daemon=True
+        ).start()
+
+        def wait_for(condition):
+            deadline = time.monotonic() + 10
+            while not condition():
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+
+        wait_for(lambda: scheduler._running)
+        with SessionLocal() as db:  # Another worker takes the lease over
+            db.query(Lease).update({Lease.holder: "other", Lease.expires_at: datetime.now() + timedelta(hours=1)})
+            db.commit()
+        wait_for(lambda: not scheduler._running)
+        print(len(terms), terms[0].is_set())
+        """,
+        PETCARE_LEADER_ELECTION="lease",
+    )
+    assert output.split() == ["1", "True"]
+
+
+def test_catch_up_steps_are_retried_after_errors(monkeypatch, caplog):
+    import main
+
+    calls, runs = [], []
+
+    def flaky(db):
+        calls.append(db)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(main, "update_expired_availability", flaky)
+    monkeypatch.setattr(main.expiry_scheduler, "retry_delay", 0.01)
+    monkeypatch.setattr(main.expiry_scheduler, "run", lambda *args, **kwargs: runs.append(args))
+    with caplog.at_level("ERROR"):
+        main.run_expiry_updates(threading.Event())
+
+    assert len(calls) == 2 and len(runs) == 1
+    assert "flaky failed" in caplog.text
+
+
+def test_crashed_jobs_release_the_lease_and_run_again():
+    output = run_isolated(
+        """
+        import threading, time
+        import leader
+        import models
+        from database import SessionLocal, initialize_database
+
+        initialize_database()
+        leader.LEASE_RENEW_INTERVAL = leader.JOB_RETRY_DELAY = 0.05
+        acquire, attempts = leader.try_acquire_lease, []
+
+        def flaky_acquire(db, name):
+            attempts.append(name)
+            if len(attempts) == 1:
+                raise RuntimeError("database is locked")
+            return acquire(db, name)
+
+        leader.try_acquire_lease = flaky_acquire
+        terms, second_term = [], threading.Event()
+
+        def job(stop):
+            terms.append(stop)
+            if len(terms) == 1:
+                raise RuntimeError("database is locked")
+            second_term.set()
+            stop.wait()
+
+        threading.Thread(target=leader.run_as_leader, args=(job, lambda: None, SessionLocal, "unused.lock"), daemon=True).start()
+        assert second_term.wait(10)
+        print(len(terms), terms[0].is_set(), terms[1].is_set())
+        """,
+        PETCARE_LEADER_ELECTION="lease",
+    )
+    assert output.split() == ["2", "True", "False"]